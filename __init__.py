@@ -1,90 +1,321 @@
-from os.path import basename, normpath, join, abspath, exists
-from argparse import ArgumentParser
-from time import perf_counter
-from os import mkdir, getcwd
-from compileall import compile_dir
-import moduletools
-import bytecode
-from shutil import rmtree
-from sys import argv
-
-
-if __name__ == '__main__':
-    bytecode._is_main = True
-    runtime = perf_counter()
-
-    parser = ArgumentParser(prog='PyToPyc',
-                            description='Takes in a Python project directory and copies all the bytecodes and non-py files to an output directory.',
-                            epilog='Visit my GitHub: heatdeathnow')
-
-    parser.add_argument('input', help='The path to your Python code.')
-    parser.add_argument('-i', '--interpreter', action='store_true',
-                        help='Should the program pack a striped-down Python interpreter with the bytecode? Default is False.')
-    parser.add_argument('-n', '--name', required='--interpreter' in argv or '-i' in argv,
-                        help="The name of your program's `main.py` file (case sensitive).This argument is required if the --interpreter/-i option \
-                        is active.")
-    parser.add_argument('-o', '--output', type=str,
-                        help='Where a copy of the input directory will be created and the bytecode and other files dumped. Default is "bytecode\\"')
-    parser.add_argument('-s', '--suffix', type=str,
-                        help="The part of the bytecode files' name to be removed. The program already identifies the standard suffix names \
-                        automatically, but if the _suffixes do not follow the standard, they can be specified with this argument.")
-    parser.add_argument('-c', '--cache', type=str, default='__pycache__',
-                        help='The name of the folder where the Python interpreter has stored all the bytecode. The default is __pycache__')
-
-    args = parser.parse_args()
-
-    bytecode._user_suffix = args.suffix
-    bytecode._cache = args.cache
-    
-    args.input = bytecode._fix_slash(args.input)
-    if abspath(args.input) == getcwd():
-        raise PermissionError('Do not pass the working directory as an input. Either move this module outside your project or put your project \
-                              inside a subdirectory')
-
-    if args.name[-3:].lower() == '.py': 
-        args.name = args.name.replace('.py', '')
-    if not exists(join(args.input, f'{args.name}.py')):
-        raise ValueError(f'PyToPyc was unable to find {join(args.input, args.name)}\nKeep in mind the names are case sensitive.')
-
-    if args.output is None:
-        args.output = basename(normpath(args.input)) + ' - bytecode\\'
-    else:
-        args.output = bytecode._fix_slash(args.output)
-
-    # Start of the program
-    if args.interpreter:
-        moduletools.copy_python(join(args.output, 'pytopyc_tmp\\'))
-        bytecode._bytecide(join(args.output, 'pytopyc_tmp\\'), bytecode._cache)
-        compile_dir(join(args.output, 'pytopyc_tmp\\'), optimize=2)
-        bytecode._recurse_copy(join(args.output, 'pytopyc_tmp\\'), join(args.output, 'pytopyc_tmp\\'), join(args.output, 'Python\\'))
-        rmtree(join(args.output, 'pytopyc_tmp\\'))
-
-    bytecode._used_suffix = bytecode._user_suffix
-    try:
-        mkdir(args.output)  # Creates the output directory. If the interpreter option was not activated, it is necessary to create the output here.
-    except FileExistsError:
-        pass
-    
-    if args.interpreter:
-        start_script = f'@ECHO OFF\ncd bytecode\\\nstart pythonw -OO {args.name}.pyc %*\n'
-        debug_script = f'@ECHO ON\ncd bytecode\\\npython -OO {args.name}.pyc %*\npause\n'
-        bytecode._recurse_copy(args.input, args.input, join(args.output, 'bytecode'))
-
-        try:
-            with open(join(args.output, 'start.bat'), 'x') as file: file.write(start_script)
-        except FileExistsError:
-            with open(join(args.output, 'start.bat'), 'w') as file: file.write(start_script)
-
-        try:
-            with open(join(args.output, 'debug.bat'), 'x') as file: file.write(debug_script)
-        except FileExistsError:
-            with open(join(args.output, 'debug.bat'), 'w') as file: file.write(debug_script)    
-    else:
-        bytecode._recurse_copy(args.input, args.input, args.output)
-
-    try:
-        print(f'Total runtime: {perf_counter() - runtime:.2f} seconds.')
-        pass
-    except ZeroDivisionError:
-        print(f'Total runtime: 0 seconds.')
-        pass
+from os.path import basename, normpath, join, abspath, exists
+from argparse import ArgumentParser
+from time import perf_counter
+from os import mkdir, getcwd
+from functools import partial
+import shlex
+import moduletools
+import report
+import interpreter
+import bytecode
+import watch
+import distribution
+import startup
+import tracing
+import lazy
+import sizes
+import ignore
+from sys import argv, executable
+
+
+if __name__ == '__main__':
+    bytecode._is_main = True
+    runtime = perf_counter()
+
+    parser = ArgumentParser(prog='PyToPyc',
+                            description='Takes in a Python project directory and copies all the bytecodes and non-py files to an output directory.',
+                            epilog='Visit my GitHub: heatdeathnow')
+
+    parser.add_argument('input', help='The path to your Python code.')
+    parser.add_argument('-i', '--interpreter', action='store_true',
+                        help='Should the program pack a striped-down Python interpreter with the bytecode? Default is False.')
+    parser.add_argument('-n', '--name', required='--interpreter' in argv or '-i' in argv,
+                        help="The name of your program's `main.py` file (case sensitive).This argument is required if the --interpreter/-i option \
+                        is active.")
+    parser.add_argument('-o', '--output', type=str,
+                        help='Where a copy of the input directory will be created and the bytecode and other files dumped. Default is "bytecode\\"')
+    parser.add_argument('-s', '--suffix', type=str,
+                        help="The part of the bytecode files' name to be removed. The program already identifies the standard suffix names \
+                        automatically, but if the _suffixes do not follow the standard, they can be specified with this argument.")
+    parser.add_argument('-c', '--cache', type=str, default='__pycache__',
+                        help='The name of the folder where the Python interpreter has stored all the bytecode. The default is __pycache__')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='How many files should be copied at the same time. The default is 1, which copies one file after the other.')
+    parser.add_argument('--compile', nargs='*', metavar='SOURCE',
+                        help='Compile the sources with optimization 2 into the output instead of copying the bytecode left by the interpreter. \
+                        If no sources are listed, the ones imported, directly or not, by the --name file are compiled.')
+    parser.add_argument('-f', '--format', choices=('dir', 'zip', 'bundle'), default='dir',
+                        help='How the bytecode is laid out in the output. "dir" mirrors the input directory; "zip" writes the bytecode into an app.zip \
+                        archive (and, with --interpreter, the standard library into the pythonXY.zip archive) loaded through zipimport; "bundle" packs \
+                        the bytecode, and that of the standard library with --interpreter, into a single app.bundle file run through app.pyc, so \
+                        that each module is found with a single lookup. Default is dir.')
+    parser.add_argument('--checksum', action='store_true',
+                        help='Also hash the files when checking which ones changed since the previous build. Default is False.')
+    parser.add_argument('--shrink', action='store_true',
+                        help='Take the docstrings out of the bytecode and deduplicate its constants to make it smaller. Default is False.')
+    parser.add_argument('--strip-lines', action='store_true',
+                        help='Also take the line tables out of the bytecode. Tracebacks will then point at the first line of each function. \
+                        Default is False.')
+    parser.add_argument('--unchecked-hash', action='store_true',
+                        help='Give the bytecode, and that of the packed standard library, unchecked hash-based headers (PEP 552) instead of \
+                        the ones recording when its source was modified, which the interpreter never checks against any source. The magic \
+                        number of every file is checked against the interpreter it is built for. Default is False.')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Only plan the build: print how many files would be copied, compiled, renamed and deleted, and how long it would \
+                        take, without writing anything.')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help='Only print the errors and the total runtime instead of a couple of lines for every file. Default is False.')
+    parser.add_argument('--report', metavar='FILE',
+                        help='Write a JSON report of the build to this file: the time, files and bytes of each phase, the slowest files and \
+                        the peak memory used.')
+    parser.add_argument('--interpreter-cache', metavar='DIRECTORY',
+                        help='Where the pruned and compiled interpreters are cached between builds, so the standard library is only compiled once \
+                        for each set of modules. The default is %%LOCALAPPDATA%%\\PyToPyc (or ~/.cache/pytopyc).')
+    parser.add_argument('--link-mode', choices=('copy', 'hardlink', 'reflink', 'auto'), default='copy',
+                        help='How the files are put in the output. "hardlink" links them to the originals (editing one edits the other), "reflink" \
+                        clones them on copy-on-write filesystems, and "auto" reflinks them or lets the kernel copy them. Whatever the filesystem \
+                        does not support falls back to a copy. Default is copy.')
+    parser.add_argument('-t', '--target', action='append', metavar='TAG',
+                        help='Only copy the bytecode cached for this cache tag and optimization level, such as cpython-312.opt-2. Can be passed \
+                        several times to build several targets from a single read of the project, each into a subdirectory of the output named \
+                        after it. By default the suffix of the first bytecode file found is used for all of them.')
+    parser.add_argument('--archive', choices=distribution.formats,
+                        help='Write the output straight into a compressed archive of this format, named after the output, instead of a \
+                        directory. The files are compressed on as many threads as --jobs, or as there are cores if --jobs is 1.')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running after the build and update the output whenever a file of the input changes, until stopped with \
+                        Ctrl+C. Only the directories that changed are updated.')
+    parser.add_argument('--poll-interval', type=float, default=0.5, metavar='SECONDS',
+                        help='How often the input is checked for changes with --watch where the system cannot report them as they happen. \
+                        Default is 0.5.')
+    parser.add_argument('--exclude', action='append', default=[], metavar='PATTERN',
+                        help='Leave out the files and folders matching this gitignore-style pattern, such as tests/ or *.log. Can be passed several \
+                        times. Version control and tool folders (.git, .venv, node_modules...) are always left out, along with what the \
+                        .pytopycignore file of the project lists. Left out folders are not walked into.')
+    parser.add_argument('--include', action='append', default=[], metavar='PATTERN',
+                        help='Only build the files matching this gitignore-style pattern, such as *.py or assets/**. Can be passed several times.')
+    parser.add_argument('--trace', action='store_true',
+                        help='Before building, run the --name file in a separate, isolated interpreter for each --workload and write down the \
+                        modules it imports, adding them to the import profile of the project. Modules imported by name at runtime, which \
+                        reading the imports misses, are then packed in with --interpreter.')
+    parser.add_argument('--workload', action='append', metavar='ARGUMENTS',
+                        help='The arguments the program is run with by --trace, as a single string, such as "--selftest". Can be passed \
+                        several times to run it once for each. By default it is run once with no arguments.')
+    parser.add_argument('--trace-timeout', type=float, default=60.0, metavar='SECONDS',
+                        help='How long each --trace run is left running before it is stopped. Default is 60.')
+    parser.add_argument('--import-profile', metavar='FILE',
+                        help=f'Where the import profile is kept. Default is {tracing.profile_name} in the project. If it exists, --interpreter \
+                        uses it, without running the program again.')
+    parser.add_argument('--profile-startup', nargs='?', type=int, const=20, metavar='N',
+                        help='Once built, run the program from the output the way the batch scripts do, with -X importtime, and print the N \
+                        modules (20 by default) that took the longest to import, along with the total. With --interpreter, the program is also \
+                        run with the interpreter running PyToPyc to compare their startups. Added to the --report if there is one.')
+    parser.add_argument('--profile-timeout', type=float, default=30.0, metavar='SECONDS',
+                        help='How long the program is left running with --profile-startup or --lazy before it is stopped. Default is 30.')
+    parser.add_argument('--size-report', nargs='?', type=int, const=20, metavar='N',
+                        help='Once built, break the output down by size and print its N biggest groups (20 by default): each top-level module \
+                        and package of the program and of the standard library, each file of the interpreter, and its libs and Scripts folders, \
+                        along with why each was included. Added to the --report if there is one.')
+    parser.add_argument('--size-budget', type=sizes.parse_size, metavar='SIZE',
+                        help='Fail the build if the output, or its archive with --archive, is bigger than this size, such as 40MB. The sizes \
+                        of its sections are printed along with it.')
+    parser.add_argument('--lazy', nargs='*', metavar='MODULE',
+                        help='Write a NAME.lazy.pyc bootstrap next to the entry point, run by the batch scripts in its place, that only loads the \
+                        modules listed once the program first uses them. If none are listed, the ones the program imports itself that took a \
+                        millisecond or more to import when it was run are. The program is run with and without it, as with --profile-startup, \
+                        to print how much startup time it saved.')
+    parser.add_argument('--prune', action='store_true',
+                        help='Leave out the bytecode of the modules of the project the --name file never imports, directly or through other \
+                        modules, as read from the bytecode itself, and print them. The modules of the import profile are kept, along with \
+                        the ones passed with --keep. Added to the --report if there is one.')
+    parser.add_argument('--keep', action='append', default=[], metavar='MODULE',
+                        help='A module or package of the project --prune keeps even though it is never imported by name, such as a plugin \
+                        loaded through importlib. Can be passed several times.')
+
+    args = parser.parse_args()
+    if args.target and (args.suffix is not None or args.interpreter and len(args.target) > 1 or args.watch and len(args.target) > 1):
+        parser.error('--target cannot be combined with --suffix, and only one target can be built with --interpreter or --watch.')
+    if args.watch and args.archive is not None:
+        parser.error('--watch cannot be combined with --archive.')
+    if args.trace and args.name is None:
+        parser.error('--trace needs the --name of the file to run.')
+    if args.profile_startup is not None and (args.archive is not None or args.target and len(args.target) > 1):
+        parser.error('--profile-startup cannot be combined with --archive or several targets, since the program is run from the \
+                     output directory.')
+    if args.lazy is not None and (args.target and len(args.target) > 1 or args.archive is not None and not args.lazy):
+        parser.error('--lazy cannot be combined with several targets, nor with --archive unless the modules are listed, since the \
+                     program is run from the output directory to find them.')
+    bytecode._is_main = not args.quiet  # Everything printed along the way is printed only when run as the main module.
+    if args.report is not None:
+        report.start()
+
+    builder = bytecode.Builder(args.jobs, args.cache, args.suffix, args.checksum, args.link_mode, args.shrink, args.strip_lines,
+                               args.exclude, args.include, args.unchecked_hash, args.prune, args.keep, report.default)
+    
+    args.input = bytecode._fix_slash(args.input)
+    if abspath(args.input) == getcwd():
+        raise PermissionError('Do not pass the working directory as an input. Either move this module outside your project or put your project \
+                              inside a subdirectory')
+
+    if args.name[-3:].lower() == '.py': 
+        args.name = args.name.replace('.py', '')
+    if not exists(join(args.input, f'{args.name}.py')):
+        raise ValueError(f'PyToPyc was unable to find {join(args.input, args.name)}\nKeep in mind the names are case sensitive.')
+
+    if args.output is None:
+        args.output = basename(normpath(args.input)) + ' - bytecode\\'
+    else:
+        args.output = bytecode._fix_slash(args.output)
+
+    profile_path = args.import_profile or join(args.input, tracing.profile_name)
+    if args.trace and not args.dry_run:
+        with report.phase('trace'):
+            workloads = [shlex.split(workload) for workload in args.workload or ['']]
+            profile = tracing.collect(args.input, args.name, workloads, args.trace_timeout, profile_path, bytecode._is_main)
+    else:
+        profile = tracing.load(profile_path)
+    if profile is not None:  # The modules the program imported when traced are kept when pruning, since some are imported by name.
+        builder.keep = [*args.keep, *tracing.modules(profile)]
+
+    sources = None
+    archive_name, order = None, ()
+    graph = None
+    with report.phase('find modules'):
+        if args.compile == [] or args.format != 'dir' or args.interpreter or args.lazy is not None or \
+           args.size_report is not None or args.size_budget is not None:  # Read once for every step that needs it.
+            graph = moduletools._import_graph(args.input, args.name, args.jobs, ignore.load(args.input, args.exclude, args.include))
+
+        if args.compile is not None:
+            sources = bytecode._find_sources(args.input, args.name, args.compile or None, args.jobs, graph)
+
+        if args.format != 'dir':
+            archive_name = f'app.{args.format}'
+            order = list(graph[1])
+
+    # Start of the program
+    package = None
+    if args.archive is not None and not args.dry_run:  # The output is then the root of the archive rather than a directory.
+        package = distribution.Distribution(args.output.rstrip('\\/') + f'.{args.archive}', args.archive, args.jobs)
+    root = '' if package is not None else args.output
+
+    try:
+        if args.interpreter:
+            python, modules = interpreter.cached_python(args.input, args.name, args.jobs, args.link_mode, args.format == 'zip',
+                                                        args.shrink, args.strip_lines, args.interpreter_cache, args.dry_run,
+                                                        profile, args.unchecked_hash, graph)
+            if python is not None:
+                python_builder = bytecode.Builder(args.jobs, checksum=args.checksum, link_mode=args.link_mode,
+                                                  shrink_bytecode=args.shrink, strip_lines=args.strip_lines,
+                                                  unchecked_hash=args.unchecked_hash, report_=report.default)
+                python_builder.build(python, join(root, 'Python\\'), dry_run=args.dry_run, distribution=package)
+
+        try:
+            if not args.dry_run and package is None: mkdir(args.output)  # Creates the output directory. If the interpreter option was not activated, it is necessary to create the output here.
+        except FileExistsError:
+            pass
+
+        project_output = join(root, 'bytecode') if args.interpreter else root
+        tag = args.target[0] if args.target and len(args.target) == 1 else None
+        bundled_lib = args.interpreter and args.format == 'bundle' and package is None  # The standard library of an archive is left in Python\Lib.
+        rebuild = partial(builder.build, args.input, project_output, sources, archive_name, order, args.name, tag,
+                          libraries=[join(args.output, 'Python', 'Lib')] if bundled_lib else (), distribution=package)
+        target = 'app.pyc' if args.format == 'bundle' else archive_name or f'{args.name}.pyc'  # The bundle is run through its bootstrap.
+        launcher = lazy.bootstrap_name(args.name) if args.lazy is not None else target  # What the batch scripts run.
+        if args.interpreter:
+            start_script = f'@ECHO OFF\ncd bytecode\\\nstart pythonw -OO {launcher} %*\n'
+            debug_script = f'@ECHO ON\ncd bytecode\\\npython -OO {launcher} %*\npause\n'
+            rebuild(dry_run=args.dry_run)
+
+            if package is not None:
+                package.add('start.bat', start_script.encode())
+                package.add('debug.bat', debug_script.encode())
+            elif not args.dry_run:
+                try:
+                    with open(join(args.output, 'start.bat'), 'x') as file: file.write(start_script)
+                except FileExistsError:
+                    with open(join(args.output, 'start.bat'), 'w') as file: file.write(start_script)
+
+                try:
+                    with open(join(args.output, 'debug.bat'), 'x') as file: file.write(debug_script)
+                except FileExistsError:
+                    with open(join(args.output, 'debug.bat'), 'w') as file: file.write(debug_script)    
+        elif args.target and len(args.target) > 1:
+            builder.build_targets(args.input, root, args.target, sources=sources, archive_name=archive_name, order=order,
+                                  entry=args.name, dry_run=args.dry_run, distribution=package)
+        else:
+            rebuild(dry_run=args.dry_run)
+
+        if args.lazy is not None and package is not None:  # It can't be run to find the modules or time it.
+            package.add(join(project_output, launcher), lazy.bootstrap(target, lazy.choose(args.input, args.name, args.lazy, workers=args.jobs, graph=graph)))
+    except BaseException:
+        if package is not None: package.abort()
+        raise
+
+    if package is not None:
+        with report.phase('archive'):
+            package.close()
+
+    if args.prune and builder.result is not None:
+        unreachable = builder.result.unreachable
+        print(f"Left out {len(unreachable)} module(s) {args.name} never imports "
+              f"({sum(size for module, location, size in unreachable) / 2 ** 10:.1f} KB): {', '.join(module for module, location, size in unreachable) or 'none'}.")
+        report.attach('unreachable', [{'module': module, 'location': location, 'bytes': size} for module, location, size in unreachable])
+
+    if args.lazy is not None and package is None and not args.dry_run:
+        with report.phase('lazy imports'):
+            directory = join(args.output, 'bytecode') if args.interpreter else args.output
+            python = startup.packed_python(args.output) if args.interpreter else None
+            eager = startup.profile(directory, target, python, 3, args.profile_timeout)
+            modules = lazy.choose(args.input, args.name, args.lazy, eager, workers=args.jobs, graph=graph)
+            lazy.write_bootstrap(join(directory, launcher), target, modules)
+            saving = lazy.saving(eager, startup.profile(directory, launcher, python, 3, args.profile_timeout))
+
+        left_out = [module for module in args.lazy if module not in modules]
+        if left_out:
+            print(f"Not made lazy, since the program doesn't import them or the interpreter imports them by itself: {', '.join(left_out)}.")
+        print(f"Made {len(modules)} module(s) lazy through {launcher}: {', '.join(modules) or 'none'}.")
+        print(f"Startup took {saving['lazy_seconds']:.3f} seconds instead of {saving['eager_seconds']:.3f} "
+              f"({saving['saved_seconds'] * 1000:.0f} ms saved), {saving['lazy_us'] / 1000:.1f} ms of it importing instead of "
+              f"{saving['eager_us'] / 1000:.1f} ms.")
+        report.attach('lazy', dict(saving, modules=modules))
+
+    analysis = None
+    if (args.size_report is not None or args.size_budget is not None) and not args.dry_run:
+        with report.phase('size report'):
+            analysis = sizes.analyze(args.output.rstrip('\\/') + f'.{args.archive}' if package is not None else args.output, args.input,
+                                     args.name, profile, args.jobs, graph)
+        sizes.print_report(analysis, args.size_report or 0)
+        report.attach('sizes', analysis)
+
+    if args.profile_startup is not None and not args.dry_run:
+        with report.phase('profile startup'):
+            directory = join(args.output, 'bytecode') if args.interpreter else args.output
+            packed = startup.packed_python(args.output) if args.interpreter else None
+            profiles = {'packed' if packed else 'system': startup.profile(directory, launcher, packed, timeout=args.profile_timeout)}
+            if packed is not None:
+                profiles['system'] = startup.profile(directory, launcher, timeout=args.profile_timeout)
+            elif args.interpreter:
+                print(f'No interpreter was found in {join(args.output, "Python")}, the program was run with {executable} instead.')
+
+        for profile in profiles.values():
+            startup.print_report(profile, args.profile_startup)
+        if packed is not None:
+            print(f"The packed interpreter spent {startup.compare(profiles['packed'], profiles['system']):.2f} times as long "
+                  f"importing at startup as the system one.")
+        report.attach('startup', profiles)
+
+    if args.report is not None:
+        report.finish(path=args.report)
+
+    if args.size_budget is not None and analysis is not None:
+        sizes.check(analysis, args.size_budget)
+
+    try:
+        print(f'Total runtime: {perf_counter() - runtime:.2f} seconds.')
+        pass
+    except ZeroDivisionError:
+        print(f'Total runtime: 0 seconds.')
+        pass
+
+    if args.watch and not args.dry_run:
+        watch.watch(builder, args.input, project_output, args.poll_interval, rebuild)
@@ -0,0 +1,71 @@
+from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED
+from os import replace
+
+
+def _module_name(arcname: str) -> str:
+    """
+    Returns the name of the module a file in the archive belongs to: `email/mime/text.pyc` is `email.mime.text` and
+    `email/__init__.pyc` is `email`. Data files belong to the package they are in.
+    """
+
+    parts = arcname.replace('\\', '/').split('/')
+    name = parts.pop()
+    if name[-4:] == '.pyc' and name != '__init__.pyc':
+        parts.append(name[:-4])
+
+    return '.'.join(parts)
+
+
+def _rank(arcname: str, order: dict) -> int:
+    """
+    Returns the position of a file's module in the import order. Modules that aren't in it are ranked by their closest
+    package that is, and files of unknown modules go last.
+    """
+
+    module = _module_name(arcname)
+    while module:
+        if module in order:
+            return order[module]
+        module = module.rpartition('.')[0]
+
+    return len(order)
+
+
+def write_zip(path: str, entries: list, order: list = (), main: str = None) -> None:
+    """
+    Writes the entries, pairs of the name a file should have in the archive and either the path to the file or its
+    content in bytes, into a zip archive that can be imported from through `zipimport`.
+
+    The files are laid out in the order their modules are imported, so that starting the program reads the archive from
+    the beginning to the end instead of jumping around it. If the name of the entry module is passed, its bytecode is
+    also written as `__main__.pyc` so that the archive can be run by the interpreter. Each folder holding files gets an
+    entry of its own, written before its first file, since `zipimport` only finds a namespace package (a folder without
+    an `__init__` module) through its folder's entry.
+
+    The archive is written to a temporary file first so that an interrupted build never leaves a broken archive behind.
+    """
+
+    order = {module: i for i, module in enumerate(dict.fromkeys(order))}
+    entries = sorted(entries, key=lambda entry: _rank(entry[0], order))  # The sort is stable, so files of the same rank keep the order they were walked in.
+
+    if main is not None:  # It's the first module the interpreter imports.
+        entries = [('__main__.pyc', content) for arcname, content in entries if arcname.replace('\\', '/') == f'{main}.pyc'] + entries
+
+    folders = set()
+    with ZipFile(path + '.tmp', 'w', ZIP_DEFLATED) as zip_file:
+        for arcname, content in entries:
+            arcname = arcname.replace('\\', '/')
+            parts = arcname.split('/')[:-1]
+            for level in range(1, len(parts) + 1):
+                folder = '/'.join(parts[:level]) + '/'
+                if folder not in folders:
+                    folders.add(folder)
+                    info = ZipInfo(folder)
+                    info.external_attr = 0o40755 << 16 | 0x10  # A directory, for both Unix and MS-DOS.
+                    zip_file.writestr(info, b'')
+            if isinstance(content, bytes):
+                zip_file.writestr(arcname, content)
+            else:
+                zip_file.write(content, arcname)
+
+    replace(path + '.tmp', path)
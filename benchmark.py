@@ -0,0 +1,358 @@
+from os.path import join, exists, getsize
+from argparse import ArgumentParser
+from tempfile import mkdtemp
+from time import perf_counter
+from os import makedirs, scandir, walk
+from py_compile import compile as compile_source
+from shutil import copy, rmtree
+from subprocess import run as run_process, DEVNULL
+import moduletools
+import bytecode
+import bundle
+import platform
+import random
+import json
+import sys
+
+
+"""
+Benchmarks the build pipeline on synthetic projects, so that a change to the tool (or an upgrade of it) can be checked
+for regressions before it's relied on. A project of the shape asked for is generated in a temporary directory: how many
+modules it has, how deep its packages go, how big its assets are and how many of its modules have bytecode in their
+cache folders. Each stage is then timed, and the number of filesystem calls it made is counted through audit hooks
+(`sys.addaudithook`), which see the calls made by this process and its threads but not by process pools.
+The results are written as JSON and can be compared with the results of a previous run.
+"""
+
+_FILESYSTEM_EVENTS = {'open', 'os.scandir', 'os.listdir', 'os.rename', 'os.remove', 'os.mkdir', 'os.rmdir', 'os.link',
+                      'os.chmod', 'os.utime', 'shutil.copyfile', 'shutil.copymode', 'shutil.rmtree'}
+_counts = None
+
+
+def _audit(event: str, args: tuple) -> None:
+    """
+    Counts the filesystem calls made while a stage is being timed. Audit hooks can't be removed once added, so this
+    one does nothing while no stage is running.
+    """
+
+    if _counts is not None and event in _FILESYSTEM_EVENTS:
+        _counts[event] = _counts.get(event, 0) + 1
+
+
+def _package_path(index: int, directories: int, depth: int) -> list:
+    """
+    Returns the package a directory of the synthetic project lives in, spreading the directories evenly over a tree
+    that is `depth` packages deep.
+    """
+
+    branching = 2
+    while branching ** depth < directories:
+        branching += 1
+
+    return [f'pkg{index // branching ** level % branching}' for level in range(depth)]
+
+
+def make_project(root: str, files: int = 1000, depth: int = 3, asset_size: int = 4096, pyc_ratio: float = 1.0,
+                 assets: int = None, seed: int = 0) -> dict:
+    """
+    Generates a synthetic project in the root directory and returns its shape: `files` modules spread over packages
+    `depth` levels deep (about twenty modules per package), each importing a standard library module and two of the
+    others so that they can all be reached from the `main.py` file in a few steps, `assets` data files of `asset_size`
+    random bytes (a quarter as many as modules by default) and, for a `pyc_ratio` fraction of the modules, the bytecode
+    the interpreter would leave when run with `-OO`. The packages' `__init__` modules are always compiled, as running
+    the program compiles them, and the entry module also imports a module of `plugins`, a namespace package (a folder
+    without an `__init__` module), so that every output format is run with one.
+    """
+
+    generator = random.Random(seed)
+    assets = files // 4 if assets is None else assets
+    stdlib = ['json', 'os', 'collections', 'functools', 'itertools', 're', 'dataclasses', 'pathlib']
+    directories = max(1, files // 20)
+    modules = ['.'.join(_package_path(i % directories, directories, depth) + [f'mod{i}']) for i in range(files)]
+
+    for i, module in enumerate(modules):
+        parts = module.split('.')[:-1]
+        name = f'mod{i}'
+        directory = join(root, *parts)
+        if not exists(directory):
+            makedirs(directory)
+            for level in range(1, len(parts) + 1):
+                init = join(root, *parts[:level], '__init__.py')
+                if not exists(init):
+                    with open(init, 'w') as file: file.write('')
+                    compile_source(init, cfile=join(root, *parts[:level], '__pycache__', f'__init__.{sys.implementation.cache_tag}.opt-2.pyc'),
+                                   optimize=2)
+
+        children = ''.join(f'import {modules[child]}\n' for child in (2 * i + 1, 2 * i + 2) if child < files)
+        source = (f'"""Synthetic module {i}."""\nimport {generator.choice(stdlib)}\n{children}\n\n'
+                  f'def function_{i}(argument):\n    """Returns the argument plus {i}."""\n    return argument + {i}\n\n\n'
+                  f'value = function_{i}({i})\n')
+        path = join(directory, f'{name}.py')
+        with open(path, 'w') as file: file.write(source)
+
+        if generator.random() < pyc_ratio:
+            compile_source(path, cfile=join(directory, '__pycache__', f'{name}.{sys.implementation.cache_tag}.opt-2.pyc'),
+                           optimize=2)
+
+    makedirs(join(root, 'plugins'), exist_ok=True)  # A namespace package: it has no `__init__` module.
+    with open(join(root, 'plugins', 'loader.py'), 'w') as file:
+        file.write('PLUGINS = []\n')
+    compile_source(join(root, 'plugins', 'loader.py'), cfile=join(root, 'plugins', '__pycache__', f'loader.{sys.implementation.cache_tag}.opt-2.pyc'),
+                   optimize=2)
+
+    with open(join(root, 'main.py'), 'w') as file:
+        file.write('import plugins.loader\n' + (f'from {modules[0]} import value\nprint(value)\n' if modules else 'print(0)\n'))
+    compile_source(join(root, 'main.py'), cfile=join(root, '__pycache__', f'main.{sys.implementation.cache_tag}.opt-2.pyc'),
+                   optimize=2)
+
+    makedirs(join(root, 'assets'), exist_ok=True)
+    for i in range(assets):
+        with open(join(root, 'assets', f'asset{i}.bin'), 'wb') as file:
+            file.write(generator.randbytes(asset_size))
+
+    return {'files': files, 'depth': depth, 'asset_size': asset_size, 'pyc_ratio': pyc_ratio, 'assets': assets, 'seed': seed}
+
+
+def _tree_size(root: str) -> tuple:
+    """
+    Returns how many files a directory tree holds and how many bytes they take.
+    """
+
+    count = size = 0
+    for directory, dirs, files in walk(root):
+        count += len(files)
+        size += sum(getsize(join(directory, file)) for file in files)
+
+    return count, size
+
+
+def _measure(function, repeat: int = 1, setup=None) -> dict:
+    """
+    Runs a stage `repeat` times, calling `setup` (untimed) before each run, and returns its best time along with the
+    filesystem calls of its best run.
+    """
+
+    global _counts
+    best, calls = None, None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        _counts = {}
+        start = perf_counter()
+        try:
+            function()
+        finally:
+            elapsed, counts, _counts = perf_counter() - start, _counts, None
+        if best is None or elapsed < best:
+            best, calls = elapsed, counts
+
+    return {'seconds': best, 'syscalls': dict(sorted(calls.items())), 'total_syscalls': sum(calls.values())}
+
+
+def _rate(result: dict, files: int, size: int) -> dict:
+    """
+    Adds to the result of a stage its throughput for the number of files and bytes it handles.
+    """
+
+    result['files'] = files
+    result['bytes'] = size
+    result['files_per_second'] = files / result['seconds'] if result['seconds'] else None
+    result['mb_per_second'] = size / result['seconds'] / 2 ** 20 if result['seconds'] else None
+    return result
+
+
+def _reset_build_state(builder: bytecode.Builder, output: str) -> None:
+    """
+    Puts a builder's state back the way `Builder.build` leaves it before walking a tree, with an index of the output
+    as it is, for stages that are timed on their own.
+    """
+
+    builder._used_suffix = builder.suffix
+    builder._errors = []
+    builder._output = output
+    builder._old_manifest = {}
+    builder._manifest = {}
+    builder._compiling = False
+    builder._archive = None
+    builder._archive_entries = []
+    builder._written = []
+    builder._operations = []
+    builder._index = bytecode._index_output(output)
+
+
+def _bytecode_dirs(project: str) -> list:
+    """
+    Returns the directories of the project that have a cache folder, each with the path relative to the project and
+    the entries of its cache folder.
+    """
+
+    dirs = []
+    for relative, files, cached in bytecode._walk(project):
+        if cached:
+            dirs.append((relative, cached))
+
+    return dirs
+
+
+def run(root: str, shape: dict, repeat: int = 3, workers: int = None) -> dict:
+    """
+    Times every stage of the pipeline on the synthetic project in the root directory: a full build and an incremental
+    rebuild (what `tobytecode` runs once it has fixed the paths), moving and renaming the bytecode, finding the modules
+    to pack, and copying the interpreter, which is skipped where no installation laid out like the Windows one is found.
+    The startup of the program built in the directory layout is then compared with its startup from a bundle, and with
+    its startup once built with unchecked hash-based bytecode.
+    """
+
+    project = join(root, 'project')
+    output = join(root, 'output')
+    files, size = _tree_size(project)
+    results = {}
+
+    def clean() -> None:
+        rmtree(output, ignore_errors=True)
+        makedirs(output)
+
+    builder = bytecode.Builder(workers)
+
+    def build() -> None:
+        builder.build(project, output)
+
+    results['build'] = _rate(_measure(build, repeat, clean), files, size)
+    results['rebuild'] = _rate(_measure(build, repeat), files, size)
+
+    dirs = _bytecode_dirs(project)
+    pycs = sum(len(cached) for relative, cached in dirs)
+    pyc_size = sum(entry.stat().st_size for relative, cached in dirs for entry in cached)
+
+    def move() -> None:
+        for relative, cached in dirs:
+            builder._move_bytecode(cached, join(output, relative), builder._list_output(relative))
+        builder._execute(output)
+
+    def empty() -> None:
+        clean()
+        for relative, cached in dirs:
+            makedirs(join(output, relative), exist_ok=True)
+        _reset_build_state(builder, output)
+
+    results['move_bytecode'] = _rate(_measure(move, repeat, empty), pycs, pyc_size)
+
+    def unrenamed() -> None:  # Copies the bytecode with its suffixes, as the original implementation did before renaming it.
+        empty()
+        for relative, cached in dirs:
+            for entry in cached:
+                copy(entry.path, join(output, relative, entry.name))
+        builder._unsuffixed(dirs[0][1][0].name)  # Sets the suffix to take out, as moving the bytecode would.
+
+    def rename() -> None:
+        for relative, cached in dirs:
+            with scandir(join(output, relative)) as entries:
+                builder._rename_bytecode(join(output, relative), {entry.name for entry in entries})
+        builder._execute(output)
+
+    if dirs:
+        results['rename_bytecode'] = _rate(_measure(rename, repeat, unrenamed), pycs, pyc_size)
+
+    results['get_modules'] = _rate(_measure(lambda: moduletools._get_modules(project, 'main', workers), repeat), shape['files'], 0)
+
+    try:
+        moduletools._get_python_path()
+    except FileNotFoundError as error:
+        results['copy_python'] = {'skipped': str(error)}
+    else:
+        python = join(root, 'python')
+        result = _measure(lambda: moduletools.copy_python(python, project, 'main', workers), repeat,
+                          lambda: rmtree(python, ignore_errors=True))
+        results['copy_python'] = _rate(result, *_tree_size(python))
+
+    bundled = join(root, 'bundled')
+    clean()
+    build()
+    makedirs(bundled)
+    builder.build(project, bundled, archive_name=f'app{bundle.extension}',
+                  order=list(moduletools._import_graph(project, 'main', workers)[1]), entry='main')
+
+    def start(script: str, directory: str) -> None:
+        run_process([sys.executable, '-OO', script], cwd=directory, check=True, stdout=DEVNULL)
+
+    results['startup_dir'] = _rate(_measure(lambda: start('main.pyc', output), repeat), shape['files'], 0)
+    results['startup_bundle'] = _rate(_measure(lambda: start('app.pyc', bundled), repeat), shape['files'], 0)
+    results['startup_bundle']['speedup'] = results['startup_dir']['seconds'] / results['startup_bundle']['seconds']
+
+    unchecked = join(root, 'unchecked')
+    makedirs(unchecked)
+    bytecode.Builder(workers, unchecked_hash=True).build(project, unchecked)
+    results['startup_unchecked_hash'] = _rate(_measure(lambda: start('main.pyc', unchecked), repeat), shape['files'], 0)
+    results['startup_unchecked_hash']['speedup'] = results['startup_dir']['seconds'] / results['startup_unchecked_hash']['seconds']
+
+    return results
+
+
+def compare(current: dict, previous: dict, threshold: float = 0.1) -> list:
+    """
+    Returns the stages that got slower by more than the threshold (a fraction of the previous time) between two runs,
+    as tuples of the stage, its previous time and its current time.
+    """
+
+    slower = []
+    for stage, result in current['results'].items():
+        old = previous['results'].get(stage, {})
+        if 'seconds' in result and 'seconds' in old and result['seconds'] > old['seconds'] * (1 + threshold):
+            slower.append((stage, old['seconds'], result['seconds']))
+
+    return slower
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(prog='PyToPyc benchmark',
+                            description='Times the build pipeline on a synthetic project and writes the results as JSON.')
+
+    parser.add_argument('--files', type=int, default=1000, help='How many modules the synthetic project has. The default is 1000.')
+    parser.add_argument('--depth', type=int, default=3, help='How many packages deep the project goes. The default is 3.')
+    parser.add_argument('--asset-size', type=int, default=4096, help='How many bytes each data file takes. The default is 4096.')
+    parser.add_argument('--assets', type=int, help='How many data files the project has. The default is a quarter of the modules.')
+    parser.add_argument('--pyc-ratio', type=float, default=1.0,
+                        help='The fraction of the modules that have bytecode in their cache folders. The default is 1.')
+    parser.add_argument('--seed', type=int, default=0, help='The seed the project is generated with. The default is 0.')
+    parser.add_argument('--repeat', type=int, default=3, help='How many times each stage is run; the best time is kept. The default is 3.')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='How many workers the stages use. The default is 1.')
+    parser.add_argument('-o', '--output', default='benchmark.json', help='Where the results are written. The default is benchmark.json.')
+    parser.add_argument('--compare', metavar='RESULTS', help='The results of a previous run to compare these with.')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='How much slower, as a fraction, a stage can get before it is reported as a regression. The default is 0.1.')
+
+    args = parser.parse_args()
+
+    sys.addaudithook(_audit)
+    root = mkdtemp(prefix='pytopyc-benchmark-')
+    try:
+        shape = make_project(join(root, 'project'), args.files, args.depth, args.asset_size, args.pyc_ratio, args.assets, args.seed)
+        results = {
+            'python': sys.version,
+            'platform': platform.platform(),
+            'shape': shape,
+            'repeat': args.repeat,
+            'jobs': args.jobs,
+            'results': run(root, shape, args.repeat, args.jobs),
+        }
+    finally:
+        rmtree(root, ignore_errors=True)
+
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2)
+
+    for stage, result in results['results'].items():
+        if 'seconds' in result:
+            print(f'{stage}: {result["seconds"]:.3f} seconds, {result["files_per_second"] or 0:.0f} files/s, '
+                  f'{result["mb_per_second"] or 0:.1f} MB/s, {result["total_syscalls"]} filesystem calls.')
+        else:
+            print(f'{stage}: skipped ({result["skipped"]})')
+    print(f'The bundle starts {results["results"]["startup_bundle"]["speedup"]:.2f} times as fast as the directory layout.')
+
+    if args.compare is not None:
+        with open(args.compare, 'r', encoding='utf-8') as file:
+            slower = compare(results, json.load(file), args.threshold)
+        for stage, before, after in slower:
+            print(f'Regression: {stage} went from {before:.3f} to {after:.3f} seconds.')
+        if slower:
+            sys.exit(1)
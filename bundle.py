@@ -0,0 +1,213 @@
+from os.path import dirname, relpath
+from importlib.util import MAGIC_NUMBER
+from os import replace, scandir
+import archive
+import marshal
+
+
+"""
+Packs the bytecode of a program into a single bundle file, so that starting it opens one file instead of searching
+every folder of `sys.path` and opening a file for every module it imports. The bundle holds the code objects of the
+modules, laid out in the order they are imported, followed by an index of where each of them lies in the file.
+A small bootstrap (`app.pyc`) is written next to it: run by the interpreter, it maps the bundle into memory, puts a
+finder for it first in `sys.meta_path`, so that finding a module is a single lookup in the index, and runs the
+program's entry module as `__main__`. The modules imported by the interpreter before the bootstrap runs are found
+the usual way, and so is everything the bundle doesn't hold.
+
+The code objects are those of the interpreter that wrote the bundle's bytecode, so the bundle must be run by that same
+version of Python, as checked by the bootstrap. Each module's `__file__` is the path its bytecode would have had in the
+directory layout, so the data files next to it are still found relative to it.
+
+Layout of the bundle: the `PYTOPYC\\0` signature, the magic number of the bytecode, the offset and the length of the
+index (8-byte little-endian integers), the code objects and the index, a marshalled dictionary with the folders the
+modules are found in, relative to the bundle, and, for each module, the offset and length of its code, whether it's a
+package and the folder it belongs to.
+"""
+
+_SIGNATURE = b'PYTOPYC\0'
+_HEADER = len(_SIGNATURE) + len(MAGIC_NUMBER) + 16
+extension = '.bundle'
+
+_BOOTSTRAP = '''\
+import sys
+import marshal
+from os.path import join, dirname, abspath, normpath
+from _frozen_importlib import ModuleSpec
+from _frozen_importlib_external import MAGIC_NUMBER
+
+
+class BundleFinder:
+    """Finds and loads the modules held in a PyToPyc bundle."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            try:
+                import mmap
+                self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ImportError, OSError, ValueError):  # mmap wasn't packed in, or the file can't be mapped.
+                self.data = file.read()
+
+        if self.data[:{signature}] != {signature_bytes!r} or self.data[{signature}:{magic}] != MAGIC_NUMBER:
+            raise ImportError(f'{{path}} is not a bundle written for this version of Python.')
+        offset = int.from_bytes(self.data[{magic}:{magic} + 8], 'little')
+        length = int.from_bytes(self.data[{magic} + 8:{magic} + 16], 'little')
+        index = marshal.loads(self.data[offset:offset + length])
+        self.roots = [normpath(join(dirname(path), *root.split('/'))) for root in index['roots']]
+        self.modules = index['modules']
+
+    def find_spec(self, name, path=None, target=None):
+        module = self.modules.get(name)
+        if module is None:
+            return None
+
+        offset, length, package, root = module
+        parts = name.split('.')
+        if package is None:  # A namespace package, whose submodules are in the bundle as well.
+            spec = ModuleSpec(name, None, is_package=True)
+            spec.submodule_search_locations.append(join(self.roots[root], *parts))
+            return spec
+
+        origin = join(self.roots[root], *parts, '__init__.pyc') if package else join(self.roots[root], *parts) + '.pyc'
+        spec = ModuleSpec(name, self, origin=origin, is_package=package)
+        if package:
+            spec.submodule_search_locations.append(dirname(origin))
+        spec.has_location = True
+        return spec
+
+    def create_module(self, spec):
+        return None
+
+    def exec_module(self, module):
+        exec(self.get_code(module.__spec__.name), module.__dict__)
+
+    def get_code(self, name):
+        offset, length, package, root = self.modules[name]
+        return marshal.loads(self.data[offset:offset + length])
+
+
+finder = BundleFinder(join(dirname(abspath(__file__)), {bundle!r}))
+sys.meta_path.insert(1 if getattr(sys.meta_path[0], 'lazy', False) else 0, finder)  # After the finder of the lazy modules, if any.
+main = type(sys)('__main__')
+main.__file__ = join(finder.roots[0], {main!r} + '.pyc')
+main.__loader__ = finder
+main.__builtins__ = __builtins__
+sys.modules['__main__'] = main
+exec(finder.get_code('__main__'), main.__dict__)
+'''
+
+
+def _library_entries(library: str) -> list:
+    """
+    Returns the bytecode files of a library folder as entries, pairs of their path relative to the folder and their path.
+    Only the folders that can be packages are looked into.
+    """
+
+    entries = []
+    stack = [library]
+    while stack:
+        with scandir(stack.pop()) as files:
+            for entry in files:
+                if entry.is_dir():
+                    if entry.name.isidentifier():
+                        stack.append(entry.path)
+                elif entry.name[-4:] == '.pyc':
+                    entries.append((relpath(entry.path, library), entry.path))
+
+    return entries
+
+
+def _code(arcname: str, content) -> bytes:
+    """
+    Returns the marshalled code object of a bytecode file, given either its path or its content, without its header.
+    """
+
+    if not isinstance(content, bytes):
+        with open(content, 'rb') as file:
+            content = file.read()
+
+    if content[:len(MAGIC_NUMBER)] != MAGIC_NUMBER:
+        raise ValueError(f'{arcname} was compiled by another version of Python than the one writing the bundle.')
+
+    return content[16:]
+
+
+def write_bootstrap(path: str, bundle: str, main: str) -> None:
+    """
+    Writes the bytecode of the bootstrap that runs the entry module from the bundle next to it, to the path passed.
+    """
+
+    source = _BOOTSTRAP.format(signature=len(_SIGNATURE), signature_bytes=_SIGNATURE, magic=len(_SIGNATURE) + len(MAGIC_NUMBER),
+                               bundle=bundle, main=main)
+    code = compile(source, '<pytopyc bootstrap>', 'exec', optimize=2)
+    with open(path + '.tmp', 'wb') as file:
+        file.write(MAGIC_NUMBER + bytes(12) + marshal.dumps(code))  # A timestamp pyc with no source to check it against.
+
+    replace(path + '.tmp', path)
+
+
+def read_index(path: str) -> dict:
+    """
+    Reads the index of a bundle: the folders its modules are found in and, for each module, the offset and length of
+    its code, whether it's a package (None for a namespace package, which has no code) and the folder it belongs to.
+    """
+
+    with open(path, 'rb') as file:
+        header = file.read(_HEADER)
+        if header[:len(_SIGNATURE)] != _SIGNATURE:
+            raise ValueError(f'{path} is not a bundle.')
+        offset = int.from_bytes(header[-16:-8], 'little')
+        length = int.from_bytes(header[-8:], 'little')
+        file.seek(offset)
+        return marshal.loads(file.read(length))
+
+
+def write_bundle(path: str, entries: list, order: list = (), main: str = None, libraries: list = ()) -> None:
+    """
+    Writes the entries, pairs of the name a bytecode file has relative to the output and either the path to the file or
+    its content in bytes, into a bundle, laid out in the order their modules are imported. The bytecode of the library
+    folders passed (such as the `Lib` folder of a packed-in interpreter) is added after them, for the modules the
+    program's own bytecode doesn't provide. If the name of the entry module is passed, its code is also stored as
+    `__main__` and the bootstrap that runs it is written next to the bundle, with the same name and a `.pyc` extension.
+    The folders holding modules without an `__init__` module of their own are indexed as namespace packages, with no
+    code, so that they're found without the folders being there.
+
+    The bundle is written to a temporary file first so that an interrupted build never leaves a broken bundle behind.
+    """
+
+    order_ranks = {module: i for i, module in enumerate(dict.fromkeys(order))}
+    entries = sorted(entries, key=lambda entry: archive._rank(entry[0], order_ranks))
+    roots = [('', entries)]
+    for library in libraries:
+        roots.append((relpath(library, dirname(path)).replace('\\', '/'), _library_entries(library)))
+
+    modules = {}
+    with open(path + '.tmp', 'wb') as file:
+        file.seek(_HEADER)
+        offset = _HEADER
+        for root, (folder, files) in enumerate(roots):
+            for arcname, content in files:
+                name = archive._module_name(arcname)
+                if name in modules:  # The program's own modules take precedence over the libraries'.
+                    continue
+
+                code = _code(arcname, content)
+                file.write(code)
+                modules[name] = (offset, len(code), arcname.replace('\\', '/').endswith('__init__.pyc'), root)
+                if root == 0 and main is not None and arcname.replace('\\', '/') == f'{main}.pyc':
+                    modules['__main__'] = (offset, len(code), False, root)
+                offset += len(code)
+
+        for name, module in list(modules.items()):  # The folders without an `__init__` module.
+            parts = name.split('.')[:-1]
+            for level in range(1, len(parts) + 1):
+                modules.setdefault('.'.join(parts[:level]), (0, 0, None, module[3]))
+
+        index = marshal.dumps({'roots': [folder for folder, files in roots], 'modules': modules})
+        file.write(index)
+        file.seek(0)
+        file.write(_SIGNATURE + MAGIC_NUMBER + offset.to_bytes(8, 'little') + len(index).to_bytes(8, 'little'))
+
+    replace(path + '.tmp', path)
+
+    if main is not None:
+        write_bootstrap(path[:-len(extension)] + '.pyc', path.rsplit('\\', 1)[-1].rsplit('/', 1)[-1], main)
@@ -1,207 +1,1213 @@
-from os.path import isdir, exists, join, normpath, basename
-from os import mkdir, listdir, rename, remove
-from time import perf_counter
-from shutil import copy, rmtree
-
-
-"""
-This program does not compile the code into bytecode by itself. If it were to use something like compile_dir, it would compile every single piece of Python code on that directory.
-However, that is not necessary. When you import a module or package into your virtual environment, not all of its parts are used. If the program were to compile everything, it would 
-bloat the amount of bytecode unnecessarily. Another option, which I considered, would have been to copy all non-`.py` and non-`.pyc` files into the new directory first and then 
-compile all files which have a bytecode equivalent (meaning they have been previously imported by the source code and therefore won't just sit there doing nothing) with optimization 2. 
-This would remove all docstrings and assert statements, which some modules and packages tend to have and that would just weight the final program down. I didn't go for this option 
-because I thought it would be redundant. It may happen that you changed your program and some modules are no longer used, this approach would compile them anyways; besides, this would 
-imply the addition of two modes for this module, one in which it just moves the bytecode with no compilation, and one in which it compiles it based on the possibly flawed assumption 
-that all the would-be corresponding bytecode was being used.
-
-The way I recommend using this program is as follows: go into your source code directory; search for all the __pycache__ files (or whatever you might have them configure to be called),
-and delete them; run your program with the `-OO` parameter (such as: `python -OO your_program_name.py`). Sometimes, this doesn't compile the `main.py` file itself (the file you ran
-your program from) so you might have to manually compile it using the following line: `py_compile.compile('your_program_name.py', optimize=2)`. After everything is compiled to
-you can simply run this module like the following: `PyToPyc.py source_code_directory outputectory`.
-"""
-
-_cache = '__pycache__'
-_used_suffix = None
-_user_suffix = None
-_is_main = False
-_suffixes = ('.cpython-311.opt-2', '.cpython-311.opt-1', '.cpython-311')
-
-
-def _bytecide(dir: str, cache: str = '__pycache__') -> None:
-    """
-    Goes through this directory tree and wipes out subdirectories whose name equals the cache variable.
-    The default value for the cache parameter is `__pycache__`.
-    """
-
-    dirs = [dir_ for dir_ in listdir(dir) if isdir(join(dir, dir_))]
-    for subdir in dirs:
-        if subdir == cache:
-            rmtree(join(dir, subdir))
-        else:
-            _bytecide(join(dir, subdir))
-
-
-def _rename_bytecode(outdir: str) -> None:
-    """
-    Removes the suffixes from the names of the bytecode files;
-    makes them the same name as the original source code file if not for the `.pyc` instead of `.py`.
-    """
-
-    global _used_suffix
-    for i in listdir(outdir):
-        if i[-4:] == '.pyc':
-            file = join(outdir, i)
-
-            if exists(file) and exists(file.replace(_used_suffix, '')):
-                if _is_main: print(f'Duplicates found, removing the one that still has its suffix.')
-                remove(file)
-
-            elif exists(file.replace(_used_suffix, '')):
-                if _is_main: print('File has already been renamed...')
-                pass
-
-            else:
-                rename(file, file.replace(_used_suffix, ''))  # Removes the suffix, making it so the file has the same name as the original script except for the extension.
-
-
-def _move_misc(indir: str, outdir: str) -> None:
-    """
-    Copies miscellaneous files in the input directory to its mirror location in the output directory.
-    """
-
-    if not exists(outdir):
-        mkdir(outdir)
-
-    for i in listdir(indir):
-        location = join(indir, i)
-        destination = join(outdir, i)
-
-        if not isdir(location) and location[-3:] != '.py' and location[-4:] != '.pyc':  # If the file isn't a folder, isn't a Python script and isn't bytecode, keep its location and create a mirror location for it in the output.
-            if exists(destination):  # If you try to copy a file that is already there, you will get a ShutilError.
-                if _is_main: print(f'File {destination} already exists...')
-                pass
-
-            else:
-                copytime = perf_counter()
-                if _is_main: print(f'Copying {location} to {destination}...')
-                copy(location, destination)
-                try:
-                    if _is_main: print(f'Time taken to copy: {perf_counter() - copytime:.2f} seconds.')
-                    pass
-                except ZeroDivisionError:
-                    if _is_main: print(f'Time taken to copy: 0 seconds.')
-                    pass
-
-
-def _move_bytecode(indir: str, outdir: str) -> None:
-    """
-    Checks if this directory has a bytecode file and, if so, moves all its content to the output file, taking the place of `.py` files.
-    """
-
-    global _used_suffix, _suffixes
-    if not exists(outdir):
-        mkdir(outdir)
-
-    if exists(join(indir, _cache)):  # Checks for the bytecode file.
-        for file in listdir(join(indir, _cache)):
-
-            i = 0
-            while _used_suffix is None:
-                try:
-                    if _suffixes[i] in str(file):
-                        _used_suffix = _suffixes[i]
-                    i += 1
-                except IndexError:
-                    raise IndexError(f'No suffix was passed and the program was unable to match the file {file} with any '
-                                     f'of the corresponding _suffixes: {[suffix for suffix in _suffixes]}')
-
-            if _user_suffix is not None and _used_suffix not in file:
-                raise KeyError(f'The program was unable to match the user passed suffix {_user_suffix} with the file {file}.')
-
-            elif _used_suffix not in file:
-                raise KeyError(f'The program had previously matched the default suffix {_used_suffix} with a file, '
-                               f'however, it was now unable to match it with the file {file}.')
-
-            elif exists(join(outdir, file).replace(_used_suffix, '')):  # Checks if the file without the suffix already exists in the output.
-                if _is_main: print(f'The file {file} has already been copied and renamed...')
-                pass
-
-            elif exists(join(outdir, file)):
-                if _is_main: print(f'The file {file} has already been copied...')
-                pass
-
-            else:
-                copytime = perf_counter()
-                if _is_main: print(f'Copying {file} to {outdir}...')
-                copy(join(indir, _cache, file), outdir)
-                if _is_main: print(f'Time taken to copy: {perf_counter() - copytime:.2f}')
-
-        _rename_bytecode(outdir)
-
-
-def _recurse_copy(input_: str, indir: str, outdir: str) -> None:
-    """
-    This function enters each path until its very end while activating the `_move_bytecode` and `_move_misc` functions. It will ignore all the other possible
-    paths it could have taken until it reaches a dead-end. After reaching a dead-end, it will return one folder and go the next fork, if one is
-    available, if not it will return one more and so on.
-    """
-    
-    _move_bytecode(indir, join(outdir, indir.replace(input_, '')))
-    _move_misc(indir, join(outdir, indir.replace(input_, '')))
-
-    for i in listdir(indir):  # Reads the directories from where it is currently at.
-        directory = join(indir, i)  # Adds them to the directory it is currently at.
-
-        if isdir(directory) and _cache not in directory and directory != indir:  # If it's a directory, and not the bytecode directory, and it's different from the original...
-            _recurse_copy(input_, directory, outdir)
-
-
-def _fix_slash(path: str) -> str:
-    r"""
-    Replaces forward slashes with backslashes in a path. If the argument passed doesn't end in either slashes, this function will add a backslash to it.
-    """
-
-    x = path.replace('/', '\\')
-    if x[-1] != '\\':
-        x += '\\'
-
-    return x
-
-
-def tobytecode(directory: str, output: str = None, cache: str = None, suffix: str = None) -> None:
-    """
-    This functions goes through an entire Python project's directory and copies all the files to the output, excep the
-    source code (`.py` files) which it leaves behind, putting the bytecode (`.pyc` files) in its would-be place.
-
-    Parameters:
-
-    directory - The path to the Python project.
-
-    output    - The path to where the program should dump the bytecode-compiled project. Default is the original name
-                plus " - bytecode".
-
-    cache     - What the IDE has named the files that contain the bytecode. Default is "__pycache__".
-
-    suffix    - The string the interpreter concatenates to the bytecode files' names. If nothing is passed, the program
-                will attempt to match the following suffixes ".cpython-311.opt-2", ".cpython-311.opt-1", ".cpython-311"
-                to the file names.
-    """
-
-    global _cache, _user_suffix, _used_suffix
-
-    if output is None:
-        output = basename(normpath(directory)) + ' - bytecode\\'
-
-    if cache is not None:
-        _cache = cache
-
-    if suffix is not None:
-        _user_suffix = suffix
-        _used_suffix = _user_suffix
-
-    try:
-        mkdir(output)
-    except FileExistsError:
-        pass
-
-    _recurse_copy(_fix_slash(directory), _fix_slash(directory), _fix_slash(output))
+from os.path import exists, join, normpath, basename, dirname
+from os import mkdir, makedirs, listdir, rename, remove, rmdir, stat, replace, scandir, cpu_count
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait
+from threading import BoundedSemaphore
+from functools import partial
+from time import perf_counter
+from shutil import rmtree
+from tempfile import TemporaryDirectory
+from hashlib import sha256
+from py_compile import compile as compile_source, PyCompileError, PycInvalidationMode
+from importlib.util import MAGIC_NUMBER
+import moduletools
+import archive
+import bundle
+import ignore
+import linking
+import report
+import shrink
+import marshal
+import json
+import sys
+import re
+
+
+"""
+This program does not compile the code into bytecode by itself. If it were to use something like compile_dir, it would compile every single piece of Python code on that directory.
+However, that is not necessary. When you import a module or package into your virtual environment, not all of its parts are used. If the program were to compile everything, it would 
+bloat the amount of bytecode unnecessarily. Another option, which I considered, would have been to copy all non-`.py` and non-`.pyc` files into the new directory first and then 
+compile all files which have a bytecode equivalent (meaning they have been previously imported by the source code and therefore won't just sit there doing nothing) with optimization 2. 
+This would remove all docstrings and assert statements, which some modules and packages tend to have and that would just weight the final program down. I didn't go for this option 
+because I thought it would be redundant. It may happen that you changed your program and some modules are no longer used, this approach would compile them anyways; besides, this would 
+imply the addition of two modes for this module, one in which it just moves the bytecode with no compilation, and one in which it compiles it based on the possibly flawed assumption 
+that all the would-be corresponding bytecode was being used.
+
+The way I recommend using this program is as follows: go into your source code directory; search for all the __pycache__ files (or whatever you might have them configure to be called),
+and delete them; run your program with the `-OO` parameter (such as: `python -OO your_program_name.py`). Sometimes, this doesn't compile the `main.py` file itself (the file you ran
+your program from) so you might have to manually compile it using the following line: `py_compile.compile('your_program_name.py', optimize=2)`. After everything is compiled to
+you can simply run this module like the following: `PyToPyc.py source_code_directory outputectory`.
+
+Alternatively, the sources can be compiled with optimization 2 by this program itself, as the last stage of the build (see `_compile_sources`). Only
+the sources passed to it, or the ones reachable through imports from the program's entry file, are compiled, which avoids compiling code that isn't used.
+"""
+
+_is_main = False  # Whether the builds print what they do, unless told otherwise (see `Builder`).
+_tag_pattern = r'[A-Za-z]+-?\d+(?:\.opt-\d+)?'  # A cache tag, such as cpython-312, with the optimization level, if any.
+_tagged = re.compile(rf'\.({_tag_pattern})\.pyc$')
+_manifest_name = '.pytopyc-manifest.json'
+_default_rate = [1000, 100 * 2 ** 20, 1.0]  # A thousand files or a hundred megabytes a second, whichever takes longer.
+_compile_seconds = 0.005
+
+
+def _bytecide(dir: str, cache: str = '__pycache__') -> None:
+    """
+    Goes through this directory tree and wipes out subdirectories whose name equals the cache variable.
+    The default value for the cache parameter is `__pycache__`.
+    """
+
+    stack = [dir]
+    while stack:
+        with scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    if entry.name == cache:
+                        rmtree(entry.path)
+                    else:
+                        stack.append(entry.path)
+
+
+def _walk(input_: str, relative: str = '', rules: tuple = None, cache: str = '__pycache__', report_: report.Report = report.default):
+    """
+    Walks the input directory tree without recursing, reading each directory only once. For every directory, yields its
+    path relative to the input, the `DirEntry`s of its files and the `DirEntry`s of the files in its cache folder, so that
+    the stat results gathered while reading the directory can be reused. Directories are visited parents first.
+    A subdirectory's path relative to the input can be passed to walk only that part of the tree.
+
+    If filter rules are passed (see `ignore.load`), the files they leave out aren't yielded, and the folders they leave
+    out are never read. The time spent reading is added to the report passed.
+    """
+
+    stack = [(join(input_, relative), relative)]
+    while stack:
+        directory, relative = stack.pop()
+        files, cached, subdirs = [], [], []
+        start = perf_counter()
+
+        with scandir(directory) as entries:
+            for entry in entries:
+                if not entry.is_dir():
+                    if not ignore.excluded(rules, join(relative, entry.name)):
+                        files.append(entry)
+                elif entry.name == cache:
+                    with scandir(entry.path) as cache_entries:
+                        cached = [cache_entry for cache_entry in cache_entries if not cache_entry.is_dir() and
+                                  not ignore.excluded(rules, join(relative, cache_entry.name.partition('.')[0] + '.py'))]
+                elif not ignore.excluded(rules, join(relative, entry.name), True):
+                    subdirs.append((entry.path, join(relative, entry.name)))
+
+        report_.add('walk', perf_counter() - start, len(files) + len(cached))
+        yield relative, files, cached
+        stack.extend(reversed(subdirs))  # Reversed so that the subdirectories are visited in the order they were read.
+
+
+def _index_output(output: str, relative: str = '') -> dict:
+    """
+    Reads the whole output directory tree once and returns the names in each of its directories, keyed by their path
+    relative to the output. The build is planned against this index rather than by checking the disk file by file.
+    A subdirectory's path relative to the output can be passed to index only that part of the tree.
+    """
+
+    index = {}
+    stack = [relative]
+    while stack:
+        relative = stack.pop()
+        names = set()
+        try:
+            with scandir(join(output, relative)) as entries:
+                for entry in entries:
+                    names.add(entry.name)
+                    if entry.is_dir():
+                        stack.append(join(relative, entry.name))
+        except FileNotFoundError:
+            continue
+        index[relative] = names
+
+    return index
+
+
+def _file_hash(location: str) -> str:
+    """
+    Returns the SHA-256 hex digest of a file's content.
+    """
+
+    digest = sha256()
+    with open(location, 'rb') as file:
+        for chunk in iter(partial(file.read, 1 << 20), b''):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def _compile(location: str, destination: str, unchecked_hash: bool = False) -> None:
+    """
+    Compiles a single source file with optimization 2 straight into its destination, with an unchecked hash-based header
+    if asked to (see `shrink.unchecked_header`).
+    """
+
+    mode = PycInvalidationMode.UNCHECKED_HASH if unchecked_hash else None
+    try:
+        compile_source(location, cfile=destination, optimize=2, doraise=True, invalidation_mode=mode)
+    except PyCompileError as error:  # It can't be pickled back from the process pool.
+        raise SyntaxError(error.msg) from None
+
+
+def _find_sources(input_: str, entry: str = None, sources: list = None, workers: int = None, graph: tuple = None,
+                  rules: tuple = None) -> list:
+    """
+    Returns the paths of the source files to compile: the ones passed, relative to the input directory or not, or, if
+    none were passed, the project's sources reachable through imports from the entry module, read from its import graph
+    unless it's passed (see `moduletools._import_graph`). The graph is read with the filter rules passed (see
+    `ignore.load`), or the project's own if there are none.
+    """
+
+    if sources is None:
+        if entry is None:
+            raise ValueError('Either the sources to compile or the entry module of the program must be passed.')
+        graph = graph if graph is not None else moduletools._import_graph(input_, entry, workers, rules)
+        sources = [path for path in graph[1].values() if path[-3:] == '.py']
+
+    return [join(input_, source) for source in sources]
+
+
+def _compile_bytes(location: str, unchecked_hash: bool = False) -> bytes:
+    """
+    Compiles a single source file with optimization 2 and returns the content of its bytecode file, with an unchecked
+    hash-based header if asked to.
+    """
+
+    with open(location, 'rb') as file:
+        source = file.read()
+    code = compile(source, location, 'exec', dont_inherit=True, optimize=2)
+
+    info = stat(location)
+    data = (MAGIC_NUMBER + (0).to_bytes(4, 'little') + (int(info.st_mtime) & 0xFFFFFFFF).to_bytes(4, 'little') +
+            (info.st_size & 0xFFFFFFFF).to_bytes(4, 'little') + marshal.dumps(code))
+    return shrink.unchecked_header(data, source=source) if unchecked_hash else data
+
+
+def _target_suffix(target: str) -> str:
+    """
+    Returns the suffix of the bytecode files cached for a target, such as `.cpython-312.opt-2` for `cpython-312.opt-2`.
+    """
+
+    if re.fullmatch(_tag_pattern, target.lstrip('.')) is None:
+        raise ValueError(f'{target!r} is not a cache tag. It must look like cpython-312 or cpython-312.opt-2.')
+
+    return f'.{target.lstrip(".")}'
+
+
+def _within(path: str, directories: set) -> bool:
+    """
+    Checks whether a relative path is one of the directories passed or lies inside one of them.
+    """
+
+    while True:
+        if path in directories:
+            return True
+        if not path:
+            return False
+        path = dirname(path)
+
+
+class BuildResult:
+    """
+    What a build did: the operations of its plan summed up by kind, with how many files and bytes each kind handled
+    (see `Builder._estimate`), how many files went into its archive, how long it was estimated to take and how long it
+    took, and the files that failed to build, as `(location, destination, error)` tuples. A build stopped by an error
+    (such as a batch build's, see `build_many`) keeps it as `error`. A pruned build keeps the modules it left out, since
+    the entry module never imports them, as `(module, location, bytes)` tuples in `unreachable`.
+    """
+
+    def __init__(self, input_: str, output: str, target: str = None, summary: dict = None, seconds: float = 0.0,
+                 errors: list = (), error: BaseException = None, unreachable: list = ()):
+        summary = summary or {}
+        self.input = input_
+        self.output = output
+        self.target = target
+        self.operations = summary.get('operations', {})
+        self.archived = summary.get('archived', 0)
+        self.estimated_seconds = summary.get('estimated_seconds', 0.0)
+        self.seconds = seconds
+        self.errors = list(errors)
+        self.error = error
+        self.unreachable = list(unreachable)
+
+    @property
+    def ok(self) -> bool:
+        """
+        Whether every file was built.
+        """
+
+        return self.error is None and not self.errors
+
+    def files(self, kind: str) -> int:
+        """
+        Returns how many files an operation (`copy`, `compile`, `rename`, `delete`, `mkdir` or `skip`) handled.
+        """
+
+        return self.operations.get(kind, {}).get('files', 0)
+
+    def summary(self) -> dict:
+        """
+        Returns the summary of the build's plan as a dictionary, as printed by a dry run or written into a report.
+        """
+
+        return {'operations': self.operations, 'archived': self.archived, 'estimated_seconds': self.estimated_seconds}
+
+    def __repr__(self) -> str:
+        return (f'<BuildResult {self.input!r} -> {self.output!r}: {self.files("copy")} copied, {self.files("compile")} '
+                f'compiled, {self.files("delete")} deleted, {self.files("skip")} up to date in {self.seconds:.2f} s'
+                f'{", failed" if not self.ok else ""}>')
+
+
+class Builder:
+    """
+    Builds projects into bytecode outputs. A builder holds the configuration of its builds and the state of the last
+    one, so that builders don't share anything: any number of them can be run one after the other or at the same time
+    in a single process (see `build_many`), and the same builder can build several times, each build starting afresh.
+    The state of the last build is what `update` takes up from.
+
+    The configuration is the number of `workers` copying the files (or compiling the sources), the name of the `cache`
+    folders, the `suffix` the interpreter gave the bytecode files (matched from their cache tags if None), whether the
+    manifest records a `checksum` of each file, the `link_mode` (see the `linking` module), whether the bytecode is
+    shrunk (`shrink_bytecode`, `strip_lines`, see the `shrink` module), the `exclude` and `include` filter rules (see
+    the `ignore` module), whether the bytecode is given unchecked hash-based headers (`unchecked_hash`), which the
+    interpreter never checks against any source, whether the bytecode of the modules the entry module can't import is
+    left out (`prune`, see `_plan_reachable`) along with the modules and packages to `keep` anyway, and whether what's
+    done is printed (`verbose`, by default when run as the main module). The builds are timed into the report passed
+    (`report_`, see the `report` module), or into one of the builder's own, which is gathered once started.
+    A thread `pool` can be passed for the copies to run on, which is then shared with whoever else uses it; otherwise
+    a pool of `workers` threads is started for each build that has more than one worker.
+    """
+
+    def __init__(self, workers: int = None, cache: str = '__pycache__', suffix: str = None, checksum: bool = False,
+                 link_mode: str = 'copy', shrink_bytecode: bool = False, strip_lines: bool = False, exclude: list = (),
+                 include: list = (), unchecked_hash: bool = False, prune: bool = False, keep: list = (),
+                 report_: report.Report = None, verbose: bool = None, pool: ThreadPoolExecutor = None):
+        self.workers = workers
+        self.cache = cache
+        self.suffix = suffix
+        self.checksum = checksum
+        self.link_mode = link_mode
+        self.shrinking = [shrink_bytecode, strip_lines]
+        self.exclude = exclude
+        self.include = include
+        self.unchecked_hash = unchecked_hash
+        self.prune = prune
+        self.keep = keep
+        self.report = report_ if report_ is not None else report.Report()
+        self._failed_links = set()  # The filesystems the link mode failed between (see `linking.materialize`).
+        self.verbose = _is_main if verbose is None else verbose
+        self.pool = pool
+        self.result = None
+
+        self._used_suffix = suffix
+        self._target = None
+        self._targeted = False
+        self._rules = None
+        self._pool = None
+        self._slots = None
+        self._copies = []
+        self._errors = []
+        self._output = None
+        self._old_manifest = {}
+        self._manifest = {}
+        self._compiling = False
+        self._archive = None
+        self._archive_entries = []
+        self._distribution = None
+        self._streamed = []
+        self._written = []
+        self._index = {}
+        self._operations = []
+        self._rate = None
+        self._pruned = set()
+        self._unreachable = []
+
+    def _list_output(self, relative: str, needed: bool = True) -> set:
+        """
+        Returns the names in this output directory, from the index of the output. If it doesn't exist yet, its creation
+        is planned and it is added to the index, unless no file is put in it (`needed`), such as a folder holding only
+        bytecode when the bytecode goes into an archive.
+        """
+
+        present = self._index.get(relative)
+        if present is None and not needed:
+            return set()
+        if present is None:
+            self._operations.append(('mkdir', None, join(self._output, relative), 0))
+            present = self._index[relative] = set()
+
+        return present
+
+    def _rename_bytecode(self, outdir: str, present: set) -> None:
+        """
+        Plans removing the suffixes from the names of the bytecode files;
+        makes them the same name as the original source code file if not for the `.pyc` instead of `.py`.
+        `present` holds the names in the output directory, which are kept up to date.
+        """
+
+        for i in [name for name in present if name[-4:] == '.pyc' and self._used_suffix in name]:  # Files without the suffix have already been renamed, they would be seen as their own duplicates.
+            file = join(outdir, i)
+            renamed = i.replace(self._used_suffix, '')
+
+            if renamed in present:
+                if self.verbose: print(f'Duplicates found, the one that still has its suffix will be removed.')
+                self._operations.append(('delete', None, file, 0))
+
+            else:
+                self._operations.append(('rename', file, join(outdir, renamed), 0))  # Removes the suffix, making it so the file has the same name as the original script except for the extension.
+                present.add(renamed)
+
+            present.discard(i)
+
+    def _copy(self, location: str, destination: str) -> None:
+        """
+        Copies a single file to its destination, or links it there depending on the link mode (see the `linking`
+        module), timing it if what's done is printed.
+        """
+
+        timed = self.verbose or self.report.active  # Timing every file adds up on large trees, so it's only done when it's shown.
+        if timed: copytime = perf_counter()
+        if self.verbose: print(f'Copying {location} to {destination}...')
+        method = linking.materialize(location, destination, self.link_mode, self._failed_links)
+        if timed: copytime = perf_counter() - copytime
+        if self.verbose: print(f'Time taken to copy {location} ({method}): {copytime:.2f} seconds.')
+        if self.report.active:
+            self.report.count_file('bytecode copy' if destination[-4:] == '.pyc' else 'misc copy', location, stat(location).st_size, copytime)
+
+    def _schedule_copy(self, location: str, destination: str) -> None:
+        """
+        Copies the file right away if there is no pool running, otherwise hands the copy to the pool. The number of
+        copies waiting in the pool is bounded so that a huge plan doesn't queue up every single file in memory. Either
+        way, a copy that fails is kept track of and the others go on.
+        """
+
+        if self._pool is None:
+            try:
+                self._copy(location, destination)
+            except Exception as error:
+                self._copy_failed(location, destination, error)
+            return
+
+        self._slots.acquire()
+        try:
+            future = self._pool.submit(self._copy, location, destination)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda future: self._slots.release())
+        self._copies.append((location, destination, future))
+
+    def _copy_failed(self, location: str, destination: str, error: BaseException) -> None:
+        """
+        Keeps track of the error of a copy that failed.
+        """
+
+        self._errors.append((location, destination, error))
+        self._manifest.pop(self._manifest_key(destination), None)  # So that the next build tries copying it again.
+
+    def _manifest_key(self, destination: str) -> str:
+        """
+        Returns the destination's path relative to the output directory, which is how files are stored in the manifest.
+        """
+
+        return destination[len(self._output):].lstrip('\\/')
+
+    def _is_current(self, location: str, destination: str, info=None, present: bool = None) -> bool:
+        """
+        Checks the manifest of the previous build to tell whether the destination is still an up-to-date copy of the
+        location and records the location's size, modification time and, if checksums are on, hash in the manifest of
+        this build. A file whose size and modification time haven't changed is taken as unchanged; if only the
+        modification time has changed and checksums are on, the content is hashed and compared.
+        The location's stat result and whether the destination is present can be passed if they are already known.
+        """
+
+        key = self._manifest_key(destination)
+        if info is None:
+            info = stat(location)
+        if present is None:
+            present = exists(destination)
+        record = [info.st_size, info.st_mtime_ns, None]
+        old = self._old_manifest.get(key)
+        self._manifest[key] = record
+
+        if old is None or not present:
+            if self.checksum: record[2] = _file_hash(location)
+            return False
+
+        if old[0] == record[0] and old[1] == record[1]:
+            record[2] = old[2]
+            return True
+
+        if self.checksum:
+            record[2] = _file_hash(location)
+            return old[0] == record[0] and old[2] == record[2]
+
+        return False
+
+    def _load_manifest(self, output: str) -> dict:
+        """
+        Reads the manifest left in the output directory by the previous build. Returns an empty manifest if there is
+        none, or if the previous build shrank its bytecode or wrote its headers differently, since every bytecode file
+        then has to be copied again. The rate at which the previous build copied files is kept to estimate how long the next copies will take.
+        """
+
+        try:
+            with open(join(output, _manifest_name), 'r', encoding='utf-8') as file:
+                manifest = json.load(file)
+            self._rate = manifest.get('rate', self._rate)
+            if manifest.get('shrink', [False, False]) != self.shrinking or manifest.get('unchecked_hash', False) != self.unchecked_hash:
+                return {}
+            return manifest['files']
+        except (FileNotFoundError, ValueError, KeyError):
+            return {}
+
+    def _save_manifest(self, output: str) -> None:
+        """
+        Writes the manifest of this build into the output directory. It is written to a temporary file first so that an
+        interrupted build never leaves a half-written manifest behind.
+        """
+
+        path = join(output, _manifest_name)
+        with open(path + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump({'version': 1, 'checksum': self.checksum, 'shrink': self.shrinking, 'unchecked_hash': self.unchecked_hash,
+                       'rate': self._rate, 'files': self._manifest}, file, separators=(',', ':'))
+        replace(path + '.tmp', path)
+
+    def _plan_prune(self, output: str) -> None:
+        """
+        Plans removing the files the previous build copied whose sources no longer exist.
+        """
+
+        for key in self._old_manifest.keys() - self._manifest.keys():
+            if basename(key) in self._index.get(dirname(key), ()):
+                self._operations.append(('delete', None, join(output, key), 0))
+
+    def _remove(self, destination: str, output: str) -> None:
+        """
+        Removes a file from the output, along with the directories it leaves empty.
+        """
+
+        if self.verbose: print(f'Removing {destination}...')
+        remove(destination)
+
+        directory = dirname(destination)
+        while len(directory) > len(output.rstrip('\\/')) and exists(directory) and not listdir(directory):
+            rmdir(directory)
+            directory = dirname(directory)
+
+    def _move_misc(self, files: list, outdir: str, present: set) -> None:
+        """
+        Plans copying miscellaneous files in the input directory to its mirror location in the output directory.
+        """
+
+        for entry in files:
+            location = entry.path
+            destination = join(outdir, entry.name)
+
+            if location[-3:] != '.py' and location[-4:] != '.pyc':  # If the file isn't a Python script and isn't bytecode, keep its location and create a mirror location for it in the output.
+                info = entry.stat()
+                if self._is_current(location, destination, info, entry.name in present):
+                    if self.verbose: print(f'File {destination} is already up to date...')
+                    self._operations.append(('skip', location, destination, info.st_size))
+
+                else:
+                    self._operations.append(('copy', location, destination, info.st_size))
+
+    def _unsuffixed(self, file: str) -> str:
+        """
+        Returns the name of a bytecode file without the suffix the interpreter added to it (its cache tag and
+        optimization level, such as `.cpython-312.opt-2`). The first file seen sets the suffix used for the rest of
+        them, unless a suffix was passed or a target is being built. When building a target, the files cached for
+        other targets are left out and None is returned for them.
+        """
+
+        if self.suffix is not None:
+            if self.suffix not in file:
+                raise KeyError(f'The program was unable to match the user passed suffix {self.suffix} with the file {file}.')
+            return file.replace(self.suffix, '')
+
+        match = _tagged.search(file)
+        if match is None:
+            raise IndexError(f'No suffix was passed and the program was unable to match the file {file} with a cache tag, '
+                             f'such as cpython-312.opt-2.')
+
+        suffix = f'.{match[1]}'
+        if self._used_suffix is None:
+            self._used_suffix = suffix
+
+        elif suffix != self._used_suffix:
+            if self._targeted:
+                return None
+            raise KeyError(f'The program had previously matched the default suffix {self._used_suffix} with a file, '
+                           f'however, it was now unable to match it with the file {file}. Pass the target to build.')
+
+        return file[:match.start()] + '.pyc'
+
+    def _move_bytecode(self, cached: list, outdir: str, present: set) -> None:
+        """
+        Checks if this directory has a bytecode file and, if so, plans moving all its content to the output file, taking the place of `.py` files.
+        If the bytecode is being archived, it is queued to be written into the archive instead.
+        """
+
+        if cached:  # Checks for the bytecode file.
+            for entry in cached:
+                file = entry.name
+                renamed = self._unsuffixed(file)
+                if renamed is None or entry.path in self._pruned:  # Cached for another target, or never imported.
+                    continue
+                info = entry.stat()
+
+                if self._archive is not None:
+                    self._archive_entries.append((self._manifest_key(join(outdir, renamed)), entry.path))
+
+                elif self._is_current(entry.path, join(outdir, renamed), info, renamed in present):  # Checks if the file without the suffix is already in the output and up to date.
+                    if self.verbose: print(f'The file {file} has already been copied and renamed...')
+                    self._operations.append(('skip', entry.path, join(outdir, renamed), info.st_size))
+
+                else:  # Copies straight into the renamed destination so the copy doesn't have to be renamed afterwards.
+                    self._operations.append(('copy', entry.path, join(outdir, renamed), info.st_size))
+                    self._written.append(join(outdir, renamed))
+                    present.add(renamed)
+
+            self._rename_bytecode(outdir, present)
+
+    def _plan_reachable(self, walked: list, entry: str) -> None:
+        """
+        Finds the bytecode of the modules the entry module can't import, directly or through other modules, so that it
+        is left out of the build. The modules are named from the bytecode in the directories walked, and their imports
+        are read from it (see `moduletools._reachable`), or from their sources when it was cached for another version of
+        Python, whose bytecode can't be read. The modules and packages the builder keeps are reached as well, for the
+        ones the program only imports by name.
+        """
+
+        local, cached_files = {}, {}
+        for relative, files, cached in walked:
+            parts = [part for part in relative.replace('\\', '/').split('/') if part]
+            sources = {file.name for file in files}
+            for cached_entry in cached:
+                renamed = self._unsuffixed(cached_entry.name)
+                if renamed is None:
+                    continue
+                name = renamed[:-4]
+                module = '.'.join(parts if name == '__init__' else parts + [name])
+                tagged = _tagged.search(cached_entry.name)  # A suffix passed by the user may not hold a cache tag.
+                current = tagged is None or tagged[1].split('.')[0] == sys.implementation.cache_tag
+                if current or f'{name}.py' not in sources:
+                    local[module] = cached_entry.path
+                else:
+                    local[module] = join(dirname(dirname(cached_entry.path)), f'{name}.py')
+                cached_files[module] = cached_entry
+
+        if entry not in local:
+            raise ValueError(f'Unable to prune the bytecode from {entry}, since the input has no bytecode of it.')
+
+        reached = moduletools._reachable(local, [entry, *self.keep], self.workers)
+        self._unreachable = [(module, cached_files[module].path, cached_files[module].stat().st_size) for module in local if module not in reached]
+        self._pruned = {location for module, location, size in self._unreachable}
+
+    def _copy_tree(self, input_: str, output: str, relative: str = '', walked: list = None) -> None:
+        """
+        Walks the input directory tree once, activating the `_move_bytecode` and `_move_misc` methods on each directory
+        with the entries read by the walk, and planning how to mirror it in the output directory. Nothing is written
+        yet. A subdirectory's path relative to the input can be passed to plan only that part of the tree, and the
+        directories of an earlier walk can be passed to plan them without reading the input again.
+        """
+
+        for relative, files, cached in walked if walked is not None else _walk(input_, relative, self._rules, self.cache, self.report):
+            with self.report.phase('plan'):
+                outdir = join(output, relative)
+                needed = self._archive is None or any(entry.name[-3:] != '.py' and entry.name[-4:] != '.pyc' for entry in files)
+                present = self._list_output(relative, needed)
+
+                if not self._compiling:  # Otherwise the bytecode is compiled from the sources instead.
+                    self._move_bytecode(cached, outdir, present)
+                self._move_misc(files, outdir, present)
+
+    def _compiled(self, location: str, destination: str, result) -> None:
+        """
+        Puts the result of compiling a source where it belongs: the archive, if the bytecode is being archived, the
+        distribution, if the build is streamed into one, or nowhere else, since it has already been written to its
+        destination.
+        """
+
+        if self._archive is not None:
+            self._archive_entries.append((self._manifest_key(destination), result))
+        elif self._distribution is not None:
+            self._streamed.append((destination, result))
+        else:
+            self._written.append(destination)
+        self.report.add('compile', files=1)
+        if self.verbose: print(f'Compiled {location} to {destination}.')
+
+    def _plan_compile(self, input_: str, output: str, sources: list) -> None:
+        """
+        Plans compiling the source files into their mirror location in the output directory (or into the archive).
+        Sources that haven't changed since the previous build are skipped, and the ones the filter rules leave out, or
+        that lie in a folder they leave out, aren't compiled.
+        """
+
+        for location in sources:
+            relative = location[len(input_):].lstrip('\\/')
+            if ignore.excluded(self._rules, relative) or ignore.excluded_folder(self._rules, dirname(relative)):
+                continue
+            destination = join(output, relative[:-3] + '.pyc')
+            key = self._manifest_key(destination)
+            try:
+                info = stat(location)
+                current = self._archive is None and self._is_current(location, destination, info, basename(key) in self._index.get(dirname(key), ()))
+            except OSError as error:
+                self._errors.append((location, destination, error))
+                continue
+
+            if current:
+                if self.verbose: print(f'The file {location} has already been compiled...')
+                self._operations.append(('skip', location, destination, info.st_size))
+            else:
+                self._operations.append(('compile', location, destination, info.st_size))
+
+    def _compile_sources(self, jobs: dict) -> None:
+        """
+        Compiles the source files with optimization 2 straight into their destinations (or into the archive),
+        spreading them across a process pool of as many processes as there are workers, if there's more than one.
+        """
+
+        in_memory = self._archive is not None or self._distribution is not None  # The archive is written in one go, after the build.
+        function = _compile_bytes if in_memory else _compile
+
+        if self.workers is None or self.workers <= 1:
+            for location, destination in jobs.items():
+                try:
+                    result = function(location, self.unchecked_hash) if in_memory else function(location, destination, self.unchecked_hash)
+                except Exception as error:
+                    self._errors.append((location, destination, error))
+                    self._manifest.pop(self._manifest_key(destination), None)
+                else:
+                    self._compiled(location, destination, result)
+            return
+
+        with ProcessPoolExecutor(self.workers) as pool:
+            futures = {}
+            for location, destination in jobs.items():
+                future = pool.submit(function, location, self.unchecked_hash) if in_memory else \
+                         pool.submit(function, location, destination, self.unchecked_hash)
+                futures[future] = (location, destination)
+
+            for future in as_completed(futures):
+                location, destination = futures[future]
+                if future.exception() is not None:
+                    self._errors.append((location, destination, future.exception()))
+                    self._manifest.pop(self._manifest_key(destination), None)
+                else:
+                    self._compiled(location, destination, future.result())
+
+    def _execute(self, output: str) -> None:
+        """
+        Carries out the planned operations: the directories are created and the leftover bytecode renamed first, then
+        the files are copied, on the builder's thread pool, or on a pool of as many threads as there are workers if
+        there is more than one, the largest files first so that no worker is left copying a big file on its own at the
+        end. The sources are compiled next and, once everything is in place, the files that are no longer needed are
+        removed. The rate the files were copied at is kept.
+        """
+
+        copies, compiles, deletes = [], {}, []
+        with self.report.phase('rename'):
+            for kind, location, destination, size in self._operations:
+                if kind == 'mkdir':
+                    makedirs(destination, exist_ok=True)  # Its parent may not have been needed.
+                elif kind == 'rename':
+                    rename(location, destination)
+                elif kind == 'copy':
+                    copies.append((size, location, destination))
+                elif kind == 'compile':
+                    compiles[location] = destination
+                elif kind == 'delete':
+                    deletes.append(destination)
+
+        start = perf_counter()
+        with self.report.phase('copy'):
+            if self.pool is None and (self.workers is None or self.workers <= 1):
+                for size, location, destination in copies:
+                    self._schedule_copy(location, destination)
+            else:
+                copies.sort(key=lambda copy: copy[0], reverse=True)
+                self._slots = BoundedSemaphore((self.workers or 1) * 4)
+                self._copies = []
+                self._pool = self.pool or ThreadPoolExecutor(max_workers=self.workers)
+                try:
+                    for size, location, destination in copies:
+                        self._schedule_copy(location, destination)
+                finally:
+                    wait([future for location, destination, future in self._copies])
+                    if self._pool is not self.pool:
+                        self._pool.shutdown()
+                    self._pool = None
+
+                for location, destination, future in self._copies:
+                    if future.exception() is not None:
+                        self._copy_failed(location, destination, future.exception())
+                self._copies = []
+
+        if copies:
+            self._rate = [len(copies), sum(copy[0] for copy in copies), perf_counter() - start]
+
+        if compiles:
+            with self.report.phase('compile'):
+                self._compile_sources(compiles)
+
+        with self.report.phase('delete'):
+            for destination in deletes:
+                self._remove(destination, output)
+
+    def _stream(self) -> None:
+        """
+        Carries out the planned operations into the distribution being written (see the `distribution` module) instead
+        of the output directory: the files are added to it straight from where the walk found them, in the order they
+        were planned. The sources are compiled in memory, and so is the bytecode to shrink read into it, to be added
+        once done.
+        """
+
+        compiles = {}
+        with self.report.phase('copy'):
+            for kind, location, destination, size in self._operations:
+                if kind == 'copy' and self._rewrites_bytecode() and destination[-4:] == '.pyc':
+                    self._streamed.append((destination, location))
+                elif kind == 'copy':
+                    self._distribution.add(destination, location)
+                    self.report.count_file('bytecode copy' if destination[-4:] == '.pyc' else 'misc copy', location, size, 0.0)
+                elif kind == 'compile':
+                    compiles[location] = destination
+
+        if compiles:
+            with self.report.phase('compile'):
+                self._compile_sources(compiles)
+
+    def _estimate(self) -> dict:
+        """
+        Sums up the planned operations by kind, with how many files and bytes each kind handles, and estimates how long
+        carrying them out will take from the rate the previous build copied files at.
+        """
+
+        operations = {kind: {'files': 0, 'bytes': 0} for kind in ('mkdir', 'rename', 'copy', 'compile', 'delete', 'skip')}
+        for kind, location, destination, size in self._operations:
+            operations[kind]['files'] += 1
+            operations[kind]['bytes'] += size
+
+        files, size, seconds = self._rate or _default_rate
+        estimate = seconds * max(operations['copy']['files'] / files, operations['copy']['bytes'] / size)
+        estimate += operations['compile']['files'] * _compile_seconds / max(self.workers or 1, 1)
+
+        return {'operations': operations, 'archived': len(self._archive_entries), 'estimated_seconds': estimate}
+
+    def _rewrites_bytecode(self) -> bool:
+        """
+        Checks whether the bytecode is rewritten once copied: shrunk, or given unchecked hash-based headers.
+        """
+
+        return any(self.shrinking) or self.unchecked_hash
+
+    def _shrink(self, paths_or_entries: list) -> list:
+        """
+        Runs the bytecode size reducer (see the `shrink` module) over the bytecode files written by the build, or over
+        the entries of the archive, and prints how much smaller the bytecode got. If the bytecode is given unchecked
+        hash-based headers, they are written along the way, once its magic number has been checked against the one of
+        the interpreter it's built for: the target, or the one its cache tag names (the one running PyToPyc for the
+        bytecode compiled by the build, or copied under a suffix holding no cache tag, such as `.pyc`).
+        """
+
+        code = any(self.shrinking)
+        magic = None
+        if self.unchecked_hash:
+            tag = None if self._compiling else self._target or self._used_suffix
+            tagged = tag is None or re.fullmatch(_tag_pattern, tag.lstrip('.')) is not None
+            magic = shrink.magic_number(tag) if tagged else MAGIC_NUMBER
+
+        if paths_or_entries and isinstance(paths_or_entries[0], tuple):
+            result, before, after = shrink.shrink_entries(paths_or_entries, self.shrinking[1], self.workers, code, magic)
+        else:
+            result = paths_or_entries
+            before, after = shrink.shrink(paths_or_entries, self.shrinking[1], self.workers, code, magic)
+
+        if self.verbose and code: print(f'Bytecode shrunk from {before} to {after} bytes ({100 - 100 * after / before if before else 0:.1f}% smaller).')
+        if self.verbose and magic is not None: print('The bytecode was given unchecked hash-based headers.')
+        return result
+
+    def _fail(self) -> None:
+        """
+        Raises the errors of every file that failed to build, if any did.
+        """
+
+        if self._errors:
+            for location, destination, error in self._errors:
+                if self.verbose: print(f'Failed to build {destination} from {location}: {error}')
+
+            raise OSError(f'{len(self._errors)} file(s) failed to build:\n' +
+                          '\n'.join(f'{location} -> {destination}: {error}' for location, destination, error in self._errors))
+
+    def zip_tree(self, input_: str, path: str, order: list = ()) -> None:
+        """
+        Writes the bytecode and the data files of a directory tree into a zip archive that can be imported from through
+        `zipimport`, such as the standard library's `pythonXY.zip`. The files are written in the order their modules are
+        imported (see `archive.write_zip`), straight from where the walk found them. The bytecode is shrunk on its way
+        into the archive if the builder shrinks it.
+        """
+
+        self._used_suffix = self.suffix
+        self._targeted = False
+        entries = []
+        for relative, files, cached in _walk(input_, cache=self.cache, report_=self.report):
+            entries.extend((join(relative, self._unsuffixed(entry.name)), entry.path) for entry in cached)
+            entries.extend((join(relative, entry.name), entry.path) for entry in files if entry.name[-3:] != '.py' and entry.name[-4:] != '.pyc')
+
+        if self._rewrites_bytecode():
+            entries = self._shrink(entries)
+
+        with self.report.phase('archive'):
+            archive.write_zip(path, entries, order)
+
+    def build(self, input_: str, output: str, sources: list = None, archive_name: str = None, order: list = (),
+              entry: str = None, target: str = None, dry_run: bool = False, libraries: list = (), distribution=None,
+              walked: list = None, rules: tuple = None) -> BuildResult:
+        """
+        Copies the input directory tree into the output directory. The build is planned first: the input tree and the
+        output tree are each read once, and every operation the build needs (creating a directory, copying, renaming,
+        compiling, deleting or skipping a file) is listed against an index of the output held in memory. The plan is
+        then carried out (see `_execute`). If more than one worker is asked for, the copies are spread across a thread
+        pool; the errors of every file that failed to copy are gathered and raised together once all the other copies
+        are done. Returns the result of the build (see `BuildResult`), with an estimate of how long it takes (see
+        `_estimate`); with `dry_run` set, nothing is written and only the plan is summed up.
+
+        The build is incremental: a manifest of every copied file is kept in the output directory, so only the files
+        that changed since the previous build are copied again, and the ones whose sources were deleted are removed.
+
+        If a list of source files is passed, they are compiled with optimization 2 into the output directory once
+        the tree has been copied, and the bytecode found in the cache folders is left behind.
+
+        If an archive name is passed, the bytecode is written into a zip archive of that name in the output directory,
+        laid out in the order of the modules passed (see `archive.write_zip`), instead of being copied next to the other
+        files. The program can then be run from the archive itself, since the entry module is added to it as `__main__`.
+        If the archive name ends in `.bundle`, the bytecode is packed into a bundle instead (see the `bundle` module),
+        along with the bytecode of the library folders passed, and is run through the bootstrap written next to it.
+
+        If a target is passed (a cache tag, such as `cpython-312.opt-2`), only the bytecode cached for it is copied. The
+        directories of an earlier walk of the input can be passed so that it isn't read again (see `build_targets`).
+
+        If a distribution is passed (see the `distribution` module), the build is streamed into it instead of being
+        written into the output directory, and the output is only the folder the files are put in inside the
+        distribution. Nothing of the previous build is reused then, and no manifest is kept.
+
+        The files and folders the builder's filter rules leave out (see the `ignore` module) aren't built, and the ones
+        a previous build copied are removed from the output. Rules already compiled by `ignore.load` can be passed.
+        """
+
+        start = perf_counter()
+        self.result = None
+        self._used_suffix = self.suffix if target is None else _target_suffix(target)
+        self._target = target
+        self._targeted = target is not None
+        self._rules = rules if rules is not None else ignore.load(input_, self.exclude, self.include)
+        self._errors = []
+        self._output = output
+        self._rate = None
+        self._distribution = distribution
+        self._streamed = []
+        self._old_manifest = self._load_manifest(output) if distribution is None else {}
+        self._manifest = {}
+        self._compiling = sources is not None
+        self._archive = archive_name
+        self._archive_entries = []
+        self._written = []
+        self._operations = []
+        self._index = _index_output(output) if distribution is None else {}
+        self._pruned = set()
+        self._unreachable = []
+
+        if self.prune and not self._compiling:  # Compiling already only compiles the sources the entry module imports.
+            with self.report.phase('plan'):
+                walked = walked if walked is not None else list(_walk(input_, rules=self._rules, cache=self.cache, report_=self.report))
+                self._plan_reachable(walked, entry)
+
+        self._copy_tree(input_, output, walked=walked)
+        with self.report.phase('plan'):
+            if sources:
+                self._plan_compile(input_, output, sources)
+            self._plan_prune(output)
+
+        summary = self._estimate()
+        if dry_run:
+            if self.verbose:
+                operations = summary['operations']
+                print(f"Dry run: {operations['copy']['files']} file(s) to copy ({operations['copy']['bytes'] / 2 ** 20:.1f} MB), "
+                      f"{operations['compile']['files']} to compile, {operations['rename']['files']} to rename, "
+                      f"{operations['delete']['files']} to delete, {operations['mkdir']['files']} director(ies) to create and "
+                      f"{operations['skip']['files']} file(s) already up to date. Estimated time: {summary['estimated_seconds']:.2f} seconds.")
+                for location, destination, error in self._errors:
+                    print(f'Unable to build {destination} from {location}: {error}')
+            self.result = BuildResult(input_, output, target, summary, perf_counter() - start, self._errors, unreachable=self._unreachable)
+            return self.result
+
+        if distribution is not None:
+            self._stream()
+        else:
+            self._execute(output)
+
+        with self.report.phase('shrink'):
+            if self._rewrites_bytecode() and self._archive is not None:
+                self._archive_entries = self._shrink(self._archive_entries)
+            elif self._rewrites_bytecode() and distribution is not None:
+                self._streamed = self._shrink(self._streamed)
+            elif self._rewrites_bytecode():
+                failed = {destination for location, destination, error in self._errors}
+                self._shrink([path for path in self._written if path not in failed])
+
+        if self._archive is not None:
+            with self.report.phase('archive'), TemporaryDirectory() as temporary:
+                folder = output if distribution is None else temporary  # The archive is then only written on its way into the distribution.
+                if self._archive.endswith(bundle.extension):
+                    bundle.write_bundle(join(folder, self._archive), self._archive_entries, order, entry, libraries)
+                else:
+                    archive.write_zip(join(folder, self._archive), self._archive_entries, order, entry)
+                if distribution is not None:
+                    for name in listdir(temporary):  # Added as bytes, since a zip distribution reads its files later, once the folder is gone.
+                        with open(join(temporary, name), 'rb') as file:
+                            distribution.add(join(output, name), file.read())
+
+        if distribution is not None:
+            with self.report.phase('copy'):
+                for destination, content in self._streamed:
+                    distribution.add(destination, content)
+        else:
+            with self.report.phase('manifest'):
+                self._save_manifest(output)
+
+        self.result = BuildResult(input_, output, target, summary, perf_counter() - start, self._errors, unreachable=self._unreachable)
+        self._fail()
+        return self.result
+
+    def build_targets(self, input_: str, output: str, targets: list, **options) -> dict:
+        """
+        Builds the input once for each of the targets passed (cache tags, such as `cpython-312.opt-2`), each into a
+        subdirectory of the output named after it, while reading the input only once: the directories of a single walk
+        are planned against each output in turn. Each output only gets the bytecode cached for its target, along with
+        the other files. Takes the same options as `build`, and returns the result of each target's build keyed by its
+        tag.
+        """
+
+        for target in targets:
+            _target_suffix(target)
+        rules = ignore.load(input_, self.exclude, self.include)
+        walked = list(_walk(input_, rules=rules, cache=self.cache, report_=self.report))
+
+        results, failures = {}, []
+        for target in targets:
+            outdir = join(output, target)
+            if not options.get('dry_run') and options.get('distribution') is None:
+                makedirs(outdir, exist_ok=True)
+            if self.verbose: print(f'Building the bytecode cached for {target} into {outdir}...')
+            try:
+                results[target] = self.build(input_, outdir, target=target, walked=walked, rules=rules, **options)
+            except OSError as error:
+                failures.append(f'{target}: {error}')
+
+        if failures:
+            raise OSError(f'{len(failures)} target(s) failed to build:\n' + '\n'.join(failures))
+
+        return results
+
+    def update(self, input_: str, output: str, directories: set) -> BuildResult:
+        """
+        Brings the output up to date with the directories of the input that changed since the last build into it,
+        given by their paths relative to the input, without walking the rest of the tree. Their subdirectories are
+        updated as well, and the ones that no longer exist are removed from the output. It takes up where the last
+        build (or update) of this builder left off, so it must follow a `build` of the same input into the same output,
+        and it plans and carries out the changes the same way, with the same filter rules. Returns the result of the
+        update.
+
+        A pruned build can't be updated, since a change anywhere can make other modules reachable: it must be built again.
+        """
+
+        if self.prune:
+            raise ValueError('A pruned build can only be brought up to date by building it again.')
+
+        start = perf_counter()
+        directories = {directory for directory in directories if not directory or not _within(dirname(directory), directories)}  # Subdirectories are walked along with their parents.
+        directories = {directory for directory in directories if not ignore.excluded_folder(self._rules, directory)}
+        self._errors = []
+        self._written = []
+        self._operations = []
+        self._old_manifest = self._manifest
+        self._manifest = {key: record for key, record in self._old_manifest.items() if not _within(dirname(key), directories)}
+
+        for directory in directories:
+            for relative in [relative for relative in self._index if _within(relative, {directory})]:
+                del self._index[relative]
+            self._index.update(_index_output(output, directory))
+
+            if exists(join(input_, directory)):
+                self._copy_tree(input_, output, directory)
+
+        with self.report.phase('plan'):
+            self._plan_prune(output)
+
+        summary = self._estimate()
+        self._execute(output)
+
+        if self._rewrites_bytecode():
+            with self.report.phase('shrink'):
+                failed = {destination for location, destination, error in self._errors}
+                self._shrink([path for path in self._written if path not in failed])
+
+        with self.report.phase('manifest'):
+            self._save_manifest(output)
+
+        self.result = BuildResult(input_, output, self._target, summary, perf_counter() - start, self._errors)
+        self._fail()
+        return self.result
+
+
+def build_many(projects: list, workers: int = None, builds: int = None, **options) -> list:
+    """
+    Builds several projects at the same time, in this process, with all their copies sharing a single pool of
+    `workers` threads (by default as many as there are cores), instead of starting a process or a pool for each one.
+    Each project is an `(input, output)` pair, or an `(input, output, options)` triple whose options are passed to its
+    `Builder.build` (such as its sources, entry module or target). The options passed here configure the builder of
+    every project (see `Builder`). Up to `builds` projects are walked and planned at once, by default as many as there
+    are workers; their output directories are created if they don't exist.
+
+    A project that fails to build doesn't stop the others: the result of each project is returned in the order they
+    were passed (see `BuildResult`), with the error that stopped it, if any.
+    """
+
+    workers = workers if workers is not None else cpu_count() or 1
+    projects = [tuple(project) if len(project) == 3 else (*project, {}) for project in projects]
+
+    def build_project(pool: ThreadPoolExecutor, input_: str, output: str, project_options: dict) -> BuildResult:
+        builder = Builder(workers, pool=pool, **options)
+        try:
+            if not project_options.get('dry_run') and project_options.get('distribution') is None:
+                makedirs(output, exist_ok=True)
+            return builder.build(input_, output, **project_options)
+        except Exception as error:
+            result = builder.result or BuildResult(input_, output, project_options.get('target'))
+            result.error = error
+            if builder.verbose: print(f'Failed to build {input_}: {error}')
+            return result
+
+    with ThreadPoolExecutor(max_workers=workers) as pool, \
+         ThreadPoolExecutor(max_workers=builds or min(workers, len(projects)) or 1) as drivers:
+        return list(drivers.map(lambda project: build_project(pool, *project), projects))
+
+
+def _fix_slash(path: str) -> str:
+    r"""
+    Replaces forward slashes with backslashes in a path. If the argument passed doesn't end in either slashes, this function will add a backslash to it.
+    """
+
+    x = path.replace('/', '\\')
+    if x[-1] != '\\':
+        x += '\\'
+
+    return x
+
+
+def tobytecode(directory: str, output: str = None, cache: str = None, suffix: str = None, workers: int = None,
+               checksum: bool = False, compile_sources: bool = False, entry: str = None, sources: list = None,
+               shrink_bytecode: bool = False, strip_lines: bool = False, link_mode: str = 'copy', report_to=None,
+               dry_run: bool = False, targets: list = None, exclude: list = None, include: list = None,
+               unchecked_hash: bool = False):
+    """
+    This functions goes through an entire Python project's directory and copies all the files to the output, excep the
+    source code (`.py` files) which it leaves behind, putting the bytecode (`.pyc` files) in its would-be place.
+
+    Parameters:
+
+    directory - The path to the Python project.
+
+    output    - The path to where the program should dump the bytecode-compiled project. Default is the original name
+                plus " - bytecode".
+
+    cache     - What the IDE has named the files that contain the bytecode. Default is "__pycache__".
+
+    suffix    - The string the interpreter concatenates to the bytecode files' names. If nothing is passed, the program
+                matches the cache tag and optimization level in the file names, such as ".cpython-312.opt-2".
+
+    workers   - How many files can be copied at the same time. Default is one, copying each file after the other.
+
+    checksum  - Whether the manifest should also record a hash of each file, so that files whose modification time
+                changed but whose content didn't aren't copied again. Default is False.
+
+    compile_sources - Whether the sources should be compiled with optimization 2 into the output, instead of copying
+                      the bytecode left by the interpreter. Default is False.
+
+    entry     - The name of the program's entry module (its `main.py` file without the extension). If the sources are
+                compiled and no sources were passed, the ones reachable through imports from this module are compiled.
+
+    sources   - The source files to compile, relative to the project's directory.
+
+    shrink_bytecode - Whether the docstrings should be taken out of the bytecode and its constants deduplicated.
+                      Default is False.
+
+    strip_lines - Whether the line tables should be taken out of the bytecode as well. Default is False.
+
+    link_mode - How the files are put in the output: "copy", "hardlink", "reflink" or "auto", which reflinks the files
+                where the filesystem supports it. Whatever isn't supported falls back to a copy. Default is "copy".
+
+    report_to - A function to pass the build report to (see the `report` module), or the path of the JSON file to
+                write it to. Default is None, which gathers no report.
+
+    dry_run   - Whether the build should only be planned, without writing anything. Default is False.
+
+    targets   - The cache tags to build the project for, such as ["cpython-311.opt-2", "cpython-312.opt-2"]. Each one is
+                built into a subdirectory of the output named after it, with only the bytecode cached for it, from a
+                single walk of the project. Default is None, which builds a single output.
+
+    exclude   - Gitignore-style rules for the files and folders to leave out of the build, such as ["tests/", "*.log"],
+                on top of the default ones (version control and tool folders such as `.git` and `node_modules`) and
+                the ones in the project's `.pytopycignore` file. Left out folders aren't walked into. Default is None.
+
+    include   - Gitignore-style rules for the only files to build, such as ["*.py", "assets/**"]. Default is None,
+                which builds every file that isn't left out.
+
+    unchecked_hash - Whether the bytecode should be given unchecked hash-based headers (PEP 552) instead of the ones
+                     recording the modification time of its source, once its magic number has been checked against
+                     the one of the interpreter it's built for. Default is False.
+
+    Returns the result of the build (see `BuildResult`): how many files were copied, compiled, renamed, deleted or
+    skipped, how long that took and how long it was estimated to take. If targets were passed, a result is returned for
+    each of them, keyed by its tag. Each call builds with a builder of its own (see `Builder`), with a report of its own,
+    so nothing carries over from one call to the next and calls made at the same time don't mix their reports.
+    """
+
+    if output is None:
+        output = basename(normpath(directory)) + ' - bytecode\\'
+
+    builder = Builder(workers, cache or '__pycache__', suffix, checksum, link_mode, shrink_bytecode, strip_lines,
+                      exclude or (), include or (), unchecked_hash)
+
+    try:
+        if not dry_run: mkdir(output)
+    except FileExistsError:
+        pass
+
+    if report_to is not None:
+        builder.report.start()
+
+    try:
+        directory, output = _fix_slash(directory), _fix_slash(output)
+        rules = ignore.load(directory, builder.exclude, builder.include)
+        if compile_sources:
+            with builder.report.phase('find modules'):
+                sources = _find_sources(directory, entry, sources, workers, rules=rules)
+        else:
+            sources = None
+
+        if targets:
+            return builder.build_targets(directory, output, targets, sources=sources, dry_run=dry_run)
+
+        return builder.build(directory, output, sources, dry_run=dry_run, rules=rules)
+    finally:
+        if isinstance(report_to, str):
+            builder.report.finish(path=report_to)
+        elif report_to is not None:
+            builder.report.finish(report_to)
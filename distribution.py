@@ -0,0 +1,209 @@
+from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED, ZIP_STORED
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from io import BytesIO
+from os import replace, remove, cpu_count
+from time import time, localtime
+import tarfile
+import gzip
+import lzma
+import zlib
+
+
+"""
+Writes the packaged program straight into a compressed archive instead of a directory, so that nothing is written to
+the disk but the archive itself: the build adds each file to the archive as it goes (see `bytecode.Builder._stream`),
+reading it from where the walk found it or passing its content when it was made in memory (compiled or shrunk bytecode,
+the batch scripts). The compression is spread across a thread pool, since zlib and lzma let go of the interpreter lock
+while they work.
+
+A zip archive has each file compressed on its own, so the files are compressed in parallel and written in the order
+they were added. A tar archive is a single stream, so it is cut into chunks that are compressed in parallel, each into
+a gzip member or an xz stream of its own; `tar`, `gzip`, `xz` and Python's `tarfile` all read these concatenated
+streams as one.
+"""
+
+formats = ('tar.gz', 'tar.xz', 'zip')
+_chunks = {'tar.gz': 1 << 20, 'tar.xz': 8 << 20}  # xz compresses a lot better with larger chunks.
+
+
+def _read(content) -> bytes:
+    """
+    Returns the content of a file, given either as bytes or as the path to the file.
+    """
+
+    if isinstance(content, bytes):
+        return content
+
+    with open(content, 'rb') as file:
+        return file.read()
+
+
+def _deflate(arcname: str, content) -> tuple:
+    """
+    Reads and compresses a file for a zip archive. Returns its zip entry, with everything but its offset in the archive
+    filled in, along with its compressed content. Files that deflate doesn't make smaller are stored as they are.
+    """
+
+    data = _read(content)
+    if isinstance(content, bytes):
+        info = ZipInfo(arcname, localtime()[:6])
+        info.external_attr = 0o644 << 16
+    else:
+        info = ZipInfo.from_file(content, arcname)
+
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    compressed = compressor.compress(data) + compressor.flush()
+    if len(compressed) < len(data):
+        info.compress_type = ZIP_DEFLATED
+    else:
+        info.compress_type, compressed = ZIP_STORED, data
+
+    info.file_size = len(data)
+    info.compress_size = len(compressed)
+    info.CRC = zlib.crc32(data)
+    return info, compressed
+
+
+class _ParallelStream:
+    """
+    A file that can only be written to, compressing what is written to it in chunks on a thread pool and writing the
+    compressed chunks to the file it wraps in order.
+    """
+
+    def __init__(self, file, compress, chunk: int, pool: ThreadPoolExecutor, window: int):
+        self.file = file
+        self.compress = compress
+        self.chunk = chunk
+        self.pool = pool
+        self.window = window
+        self.buffer = bytearray()
+        self.pending = deque()
+
+    def write(self, data) -> int:
+        self.buffer += data
+        while len(self.buffer) >= self.chunk:
+            self._submit(bytes(self.buffer[:self.chunk]))
+            del self.buffer[:self.chunk]
+
+        return len(data)
+
+    def _submit(self, data: bytes) -> None:
+        self.pending.append(self.pool.submit(self.compress, data))
+        while len(self.pending) > self.window:  # Bounds how much is held in memory.
+            self.file.write(self.pending.popleft().result())
+
+    def close(self) -> None:
+        if self.buffer:
+            self._submit(bytes(self.buffer))
+            self.buffer.clear()
+        while self.pending:
+            self.file.write(self.pending.popleft().result())
+
+
+class Distribution:
+    """
+    A compressed archive the packaged program is written into, in one of the `formats`. Files are added with `add` and
+    the archive is complete once closed; it is written under a temporary name until then, so an interrupted build never
+    leaves a broken archive behind. Can be used as a context manager, which closes it, or throws it away on an error.
+    """
+
+    def __init__(self, path: str, format: str, workers: int = None):
+        if format not in formats:
+            raise ValueError(f'Unknown archive format {format!r}. It must be one of: {", ".join(formats)}.')
+
+        self.path = path
+        self.format = format
+        workers = workers if workers is not None and workers > 1 else cpu_count() or 1
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.window = workers * 4
+        self.pending = deque()
+        self.file = open(path + '.tmp', 'wb')
+
+        if format == 'zip':
+            self.zip = ZipFile(self.file, 'w')
+        else:
+            compress = (lambda data: gzip.compress(data, mtime=0)) if format == 'tar.gz' else lzma.compress
+            self.stream = _ParallelStream(self.file, compress, _chunks[format], self.pool, self.window)
+            self.tar = tarfile.open(fileobj=self.stream, mode='w|', format=tarfile.PAX_FORMAT)
+
+    def add(self, arcname: str, content) -> None:
+        """
+        Adds a file to the archive under the name passed, given either as the path to the file or as its content.
+        """
+
+        arcname = '/'.join(part for part in arcname.replace('\\', '/').split('/') if part)
+        if self.format == 'zip':
+            self.pending.append(self.pool.submit(_deflate, arcname, content))
+            while len(self.pending) > self.window:
+                self._write_zip_entry(*self.pending.popleft().result())
+            return
+
+        if isinstance(content, bytes):
+            info = tarfile.TarInfo(arcname)
+            info.size = len(content)
+            info.mtime = int(time())
+            info.mode = 0o644
+            self.tar.addfile(info, BytesIO(content))
+        else:
+            info = self.tar.gettarinfo(content, arcname)
+            with open(content, 'rb') as file:
+                self.tar.addfile(info, file)
+
+    def _write_zip_entry(self, info: ZipInfo, compressed: bytes) -> None:
+        """
+        Writes a file compressed on the pool into the zip archive. `ZipFile` can only compress the files itself, so the
+        entry is written the way `ZipFile.writestr` writes it, and listed for the central directory written on closing.
+        """
+
+        info.header_offset = self.zip.fp.tell()
+        self.zip.fp.write(info.FileHeader())
+        self.zip.fp.write(compressed)
+        self.zip.filelist.append(info)
+        self.zip.NameToInfo[info.filename] = info
+        self.zip.start_dir = self.zip.fp.tell()
+
+    def close(self) -> None:
+        """
+        Writes what's left of the archive and gives it its name.
+        """
+
+        try:
+            if self.format == 'zip':
+                while self.pending:
+                    self._write_zip_entry(*self.pending.popleft().result())
+                self.zip.close()
+            else:
+                self.tar.close()
+                self.stream.close()
+        finally:
+            self.pool.shutdown()
+            self.file.close()
+
+        replace(self.path + '.tmp', self.path)
+
+    def abort(self) -> None:
+        """
+        Throws away the archive being written.
+        """
+
+        self.pool.shutdown(cancel_futures=True)
+        try:  # Closes the archive so it doesn't try writing its end once the file is gone.
+            (self.zip if self.format == 'zip' else self.tar).close()
+        except (OSError, ValueError):
+            pass
+        self.file.close()
+        try:
+            remove(self.path + '.tmp')
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, kind, error, traceback):
+        if kind is None:
+            self.close()
+        else:
+            self.abort()
+
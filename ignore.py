@@ -0,0 +1,161 @@
+from os.path import join
+import tracing
+import re
+
+
+"""
+Decides which files and folders of a project are left out of its build, from rules written like the ones of a
+`.gitignore` file: the default rules below, then the ones in the project's `.pytopycignore` file, if it has one, then
+the ones passed to the build, each rule taking precedence over the ones before it.
+
+- `*` matches anything but a slash, `?` a single character but a slash, and `[abc]` one of the characters listed.
+- `**` matches any number of folders: `**/fixtures`, `docs/**` and `a/**/b`.
+- A rule with a slash at its start or in its middle is matched from the project's folder; any other rule is matched
+  against the names at every depth.
+- A rule ending in a slash only matches folders.
+- A rule starting with `!` brings back what an earlier rule left out. As with git, a file can't be brought back if a
+  folder it's in was left out, since left out folders are never walked into.
+- Lines that are blank or start with `#` are skipped.
+
+Include rules, when there are any, are matched against the files only: files no include rule matches are left out,
+while folders are still walked into. Bytecode is matched by the name of its source: `mod.cpython-312.pyc` in the cache
+folder of `pkg` is matched as `pkg/mod.py`.
+
+The rules are compiled into regular expressions once, and folders are matched as the walk reads them, so that a left out
+folder, such as a virtual environment or `node_modules`, is never read at all.
+"""
+
+ignore_file = '.pytopycignore'
+_default_rules = ['.git/', '.hg/', '.svn/', '.venv/', '.tox/', '.nox/', '.mypy_cache/', '.pytest_cache/',
+                  '.ruff_cache/', 'node_modules/', f'/{ignore_file}', f'/{tracing.profile_name}']
+
+
+def _translate(pattern: str) -> str:
+    """
+    Returns the regular expression matching the paths a pattern matches, relative to the project's folder and with
+    forward slashes.
+    """
+
+    anchored = '/' in pattern
+    pattern = pattern.lstrip('/')
+    expression = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            expression.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            expression.append('.*')
+            i += 2
+        elif pattern[i] == '*':
+            expression.append('[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            expression.append('[^/]')
+            i += 1
+        elif pattern[i] == '[' and ']' in pattern[i + 2:]:
+            end = pattern.index(']', i + 2)
+            characters = pattern[i + 1:end]
+            if characters[0] == '!':
+                characters = '^' + characters[1:]
+            expression.append(f'[{characters.replace(chr(92), chr(92) * 2)}]')
+            i = end + 1
+        elif pattern[i] == '\\' and i + 1 < len(pattern):
+            expression.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            expression.append(re.escape(pattern[i]))
+            i += 1
+
+    return ('' if anchored else '(?:.*/)?') + ''.join(expression)
+
+
+def compile_rules(patterns: list) -> tuple:
+    """
+    Compiles a list of rules into the `(files, folders, ordered)` used by `excluded`. If none of the rules brings anything
+    back, each kind of path is matched against a single regular expression joining every rule that applies to it;
+    otherwise the rules are kept in order, as `(expression, negated, folders only)` tuples, and the last one to match
+    a path decides.
+    """
+
+    rules = []
+    for pattern in patterns:
+        pattern = pattern.strip()
+        if not pattern or pattern[0] == '#':
+            continue
+        negated = pattern[0] == '!'
+        pattern = pattern[1:] if negated else pattern
+        if pattern[:2] == '\\!' or pattern[:2] == '\\#':
+            pattern = pattern[1:]
+        folders = pattern[-1] == '/'
+        rules.append((_translate(pattern.rstrip('/')), negated, folders))
+
+    if any(negated for expression, negated, folders in rules):
+        return None, None, [(re.compile(expression), negated, folders) for expression, negated, folders in rules]
+
+    def join_rules(expressions: list):
+        return re.compile('|'.join(f'(?:{expression})' for expression in expressions)) if expressions else None
+
+    return (join_rules([expression for expression, negated, folders in rules if not folders]),
+            join_rules([expression for expression, negated, folders in rules]), None)
+
+
+def load(project: str, exclude: list = (), include: list = ()) -> tuple:
+    """
+    Returns the compiled exclude and include rules of a project: the default rules, the ones in its ignore file and the
+    ones passed.
+    """
+
+    patterns = list(_default_rules)
+    try:
+        with open(join(project, ignore_file), 'r', encoding='utf-8') as file:
+            patterns.extend(file.read().splitlines())
+    except FileNotFoundError:
+        pass
+    patterns.extend(exclude)
+
+    return compile_rules(patterns), compile_rules(include) if include else None
+
+
+def _matches(rules: tuple, path: str, folder: bool) -> bool:
+    """
+    Checks whether compiled rules leave a path out.
+    """
+
+    files, folders, ordered = rules
+    if ordered is None:
+        expression = folders if folder else files
+        return expression is not None and expression.fullmatch(path) is not None
+
+    for expression, negated, folders_only in reversed(ordered):
+        if (folder or not folders_only) and expression.fullmatch(path) is not None:
+            return not negated
+
+    return False
+
+
+def excluded(rules: tuple, path: str, folder: bool = False) -> bool:
+    """
+    Checks whether a file or a folder, given by its path relative to the project, is left out by the rules returned by
+    `load`.
+    """
+
+    if rules is None:
+        return False
+
+    exclude, include = rules
+    path = path.replace('\\', '/')
+    if _matches(exclude, path, folder):
+        return True
+
+    return not folder and include is not None and not _matches(include, path, False)
+
+
+def excluded_folder(rules: tuple, path: str) -> bool:
+    """
+    Checks whether a folder, given by its path relative to the project, is left out by the rules, or lies in a folder
+    that is.
+    """
+
+    parts = path.replace('\\', '/').split('/')
+    return any(excluded(rules, '/'.join(parts[:i]), True) for i in range(1, len(parts) + 1) if parts[i - 1])
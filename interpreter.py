@@ -0,0 +1,104 @@
+from os.path import join, exists, expanduser
+from compileall import compile_dir
+from py_compile import PycInvalidationMode
+from hashlib import sha256
+from shutil import rmtree
+from os import getenv, getpid, makedirs, rename
+import moduletools
+import report
+import bytecode
+import json
+import sys
+
+
+"""
+Keeps the pruned and compiled interpreters PyToPyc packs in with the programs in an on-disk cache, so that the standard
+library is only copied and compiled once for each interpreter and set of modules. Each entry of the cache is the tree
+that gets copied into the `Python\\` folder of the output: the interpreter, its modules with their bytecode in the cache
+folders and, if the standard library is zipped, the `pythonXY.zip` archive in place of the `Lib` folder.
+An entry is built under a temporary name and renamed once it's complete, so a build that was interrupted, or one that
+runs at the same time, never sees a half-built entry. The cache can be deleted at any time.
+"""
+
+
+def _default_cache_dir() -> str:
+    """
+    Returns the folder the cache is kept in when none is passed: `%LOCALAPPDATA%\\PyToPyc` on Windows and
+    `~/.cache/pytopyc` elsewhere.
+    """
+
+    if getenv('LOCALAPPDATA'):
+        return join(getenv('LOCALAPPDATA'), 'PyToPyc')
+
+    return join(getenv('XDG_CACHE_HOME') or expanduser('~/.cache'), 'pytopyc')
+
+
+def _cache_key(python_path: str, modules: list, zipped: bool, shrink_bytecode: bool, strip_lines: bool,
+               unchecked_hash: bool = False) -> str:
+    """
+    Returns the name of the cache entry for an interpreter, the modules packed in and the way they are laid out.
+    """
+
+    key = {
+        'version': sys.version,
+        'path': python_path,
+        'modules': sorted(modules),
+        'zip': [shrink_bytecode, strip_lines] if zipped else None,
+        'unchecked_hash': unchecked_hash,
+    }
+
+    return sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()[:32]
+
+
+def cached_python(project: str = None, entry: str = None, workers: int = None, link_mode: str = 'copy',
+                  zipped: bool = False, shrink_bytecode: bool = False, strip_lines: bool = False,
+                  cache_dir: str = None, dry_run: bool = False, profile: dict = None, unchecked_hash: bool = False,
+                  graph: tuple = None) -> tuple:
+    """
+    Returns the path to a pruned interpreter holding the modules the project needs (see `moduletools.copy_python`), with
+    its modules compiled with optimization 2, along with the list of those modules. The interpreter is taken from the
+    cache if it's there and built into it otherwise. If `zipped` is set, the standard library is written into the
+    `pythonXY.zip` archive of the entry (see `bytecode.Builder.zip_tree`), shrunk if asked to. With `dry_run` set,
+    nothing is built and the path returned is None if the interpreter isn't cached yet. A profile of the modules the
+    program imported when run can be passed (see `moduletools._get_modules`). With `unchecked_hash` set, the standard
+    library is compiled into unchecked hash-based bytecode, which the interpreter never checks against its sources.
+    The import graph of the project can be passed if it was already read (see `moduletools._import_graph`).
+    """
+
+    cache_dir = cache_dir or _default_cache_dir()
+    python_path = moduletools._get_python_path()
+    with report.phase('find modules'):
+        modules = moduletools._get_modules(project, entry, workers, submodules=True, profile=profile, graph=graph)
+    path = join(cache_dir, _cache_key(python_path, modules, zipped, shrink_bytecode, strip_lines, unchecked_hash))
+    if exists(path):
+        if bytecode._is_main: print(f'Using the interpreter cached in {path}...')
+        return path, modules
+
+    if dry_run:
+        if bytecode._is_main: print(f'The interpreter would be copied and compiled into the cache at {path} first.')
+        return None, modules
+
+    if bytecode._is_main: print(f'Building the interpreter into the cache at {path}...')
+    temporary = f'{path}.{getpid()}.tmp'
+    rmtree(temporary, ignore_errors=True)
+    makedirs(cache_dir, exist_ok=True)
+    try:
+        with report.phase('interpreter copy'):
+            moduletools.copy_python(temporary, project, entry, workers, link_mode, modules)
+            bytecode._bytecide(temporary)
+        with report.phase('compile'):
+            mode = PycInvalidationMode.UNCHECKED_HASH if unchecked_hash else None
+            compile_dir(temporary, optimize=2, workers=workers or 1, quiet=not bytecode._is_main, invalidation_mode=mode)
+        if zipped:  # The interpreter finds the pythonXY.zip archive next to it by itself.
+            builder = bytecode.Builder(workers, shrink_bytecode=shrink_bytecode, strip_lines=strip_lines, unchecked_hash=unchecked_hash,
+                                       report_=report.default)
+            builder.zip_tree(join(temporary, 'Lib'), join(temporary, f'python{sys.version_info.major}{sys.version_info.minor}.zip'), modules)
+            rmtree(join(temporary, 'Lib'))
+        rename(temporary, path)
+    except OSError:
+        if not exists(path):  # Unless another build finished the same entry first.
+            raise
+    finally:
+        rmtree(temporary, ignore_errors=True)
+
+    return path, modules
@@ -0,0 +1,135 @@
+from importlib.util import MAGIC_NUMBER
+from os import replace
+import moduletools
+import marshal
+
+
+"""
+Puts off the import of the heavy modules of a program until it first uses them, so that the ones it only needs now and
+then no longer slow its startup down. A bootstrap is written next to the program's entry point (`main.lazy.pyc` for a
+`main` entry, a name no module can be imported by): run by the interpreter in its place, it puts a finder first in
+`sys.meta_path` that has the modules listed loaded through `importlib.util.LazyLoader`, then runs the entry point as
+`__main__`. Importing one of them then only creates the module; its code runs once one of its attributes is first used,
+which `from module import name` does right away. Extension modules are always loaded right away, since their loaders
+can't be deferred.
+
+The modules are either listed, or taken from the import-cost report of the program started without the bootstrap (see
+`startup.profile`): the ones it imports itself whose import took the longest. Either way, only the modules the program
+can import are kept (see `moduletools._import_graph`), and the ones the interpreter imports by itself are left out,
+since they are loaded before the bootstrap runs. A module whose import has side effects the program relies on, such as
+registering a codec or a plugin, should not be made lazy.
+"""
+
+_heavy_us = 1000  # How many microseconds the import of a module must take for it to be made lazy when none are listed.
+
+_BOOTSTRAP = '''\
+import sys
+from os.path import join, dirname, abspath
+from importlib.util import LazyLoader
+from importlib.machinery import ExtensionFileLoader
+
+
+class LazyFinder:
+    """Has the modules listed by PyToPyc loaded once they're first used."""
+
+    lazy = True  # Has the finder of a bundle put after this one.
+    modules = {modules!r}
+
+    @classmethod
+    def find_spec(cls, name, path=None, target=None):
+        if name not in cls.modules:
+            return None
+
+        for finder in sys.meta_path[sys.meta_path.index(cls) + 1:]:
+            spec = finder.find_spec(name, path, target) if hasattr(finder, 'find_spec') else None
+            if spec is not None:
+                break
+        else:
+            return None
+
+        if hasattr(spec.loader, 'exec_module') and not isinstance(spec.loader, ExtensionFileLoader):
+            spec.loader = LazyLoader(spec.loader)
+        return spec
+
+
+sys.meta_path.insert(0, LazyFinder)
+path = join(dirname(abspath(__file__)), {target!r})
+sys.argv[0] = path
+if path[-4:] == '.pyc':  # Run as the interpreter runs bytecode, without importing anything.
+    import marshal
+    main = type(sys)('__main__')
+    main.__file__ = path
+    main.__builtins__ = __builtins__
+    sys.modules['__main__'] = main
+    with open(path, 'rb') as file:
+        code = marshal.loads(file.read()[16:])
+    exec(code, main.__dict__)
+else:
+    import runpy
+    runpy.run_path(path, run_name='__main__')
+'''
+
+
+def bootstrap_name(entry: str) -> str:
+    """
+    Returns the name of the bootstrap written for an entry module.
+    """
+
+    return f'{entry}.lazy.pyc'
+
+
+def choose(project: str, entry: str, modules: list = (), report: dict = None, threshold_us: int = _heavy_us,
+           workers: int = None, graph: tuple = None) -> list:
+    """
+    Returns the modules to make lazy: the ones passed or, if there are none, the ones the program imports itself (at
+    the top of the import-cost report of its startup) whose import took `threshold_us` microseconds or more, the
+    costliest first. The modules the program can't import, and the ones the interpreter imports by itself, are left
+    out. The import graph of the program can be passed if it was already read.
+    """
+
+    stdlib, local = graph if graph is not None else moduletools._import_graph(project, entry, workers)
+    startup = set(moduletools._startup_modules())
+    if not modules and report is not None:
+        modules = [module['module'] for module in report['modules'] if module['depth'] == 0 and module['cumulative_us'] >= threshold_us]
+
+    return [module for module in dict.fromkeys(modules) if (module in stdlib or module in local) and module not in startup
+            and module != entry]
+
+
+def bootstrap(target: str, modules: list) -> bytes:
+    """
+    Returns the content of the bytecode file of the bootstrap that makes the modules passed lazy and runs the target,
+    the entry point next to it: the entry module's bytecode, the zip archive or the bootstrap of a bundle.
+    """
+
+    code = compile(_BOOTSTRAP.format(modules=frozenset(modules), target=target), '<pytopyc lazy bootstrap>', 'exec', optimize=2)
+    return MAGIC_NUMBER + bytes(12) + marshal.dumps(code)  # A timestamp pyc with no source to check it against.
+
+
+def write_bootstrap(path: str, target: str, modules: list) -> None:
+    """
+    Writes the bootstrap that makes the modules passed lazy and runs the target (see `bootstrap`) to the path passed.
+    """
+
+    with open(path + '.tmp', 'wb') as file:
+        file.write(bootstrap(target, modules))
+
+    replace(path + '.tmp', path)
+
+
+def saving(eager: dict, lazy: dict) -> dict:
+    """
+    Returns how much time the bootstrap saved at startup, from the import-cost reports of the program started without
+    it and with it (see `startup.profile`): the microseconds spent importing and the seconds the whole run took, with
+    and without it. The code of a lazy module runs once it's used rather than when it's imported, so the time it takes
+    is only counted in the seconds.
+    """
+
+    return {
+        'eager_us': eager['total_us'],
+        'lazy_us': lazy['total_us'],
+        'saved_us': eager['total_us'] - lazy['total_us'],
+        'eager_seconds': eager['seconds'],
+        'lazy_seconds': lazy['seconds'],
+        'saved_seconds': eager['seconds'] - lazy['seconds'],
+    }
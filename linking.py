@@ -0,0 +1,132 @@
+from os.path import dirname
+from shutil import copy, copymode
+from os import link, remove, stat, fstat
+import errno
+import os
+
+try:
+    from fcntl import ioctl
+except ImportError:  # Windows has no ioctl, so reflinks are never attempted there.
+    ioctl = None
+
+
+"""
+Materializes a file at its destination without necessarily duplicating its bytes. Besides copying, the file can be
+hard linked (both names then point at the same data, so nothing is written at all), reflinked (the destination shares
+the source's blocks until either is written to, on copy-on-write filesystems such as Btrfs and XFS) or copied through
+`copy_file_range`, which lets the kernel copy, or clone, the data without it going through the program.
+Whenever a mode isn't supported between two filesystems, the file is copied instead, and that pair of filesystems is
+remembered in the set of failures passed along (each builder keeps its own), so the failing mode isn't tried again for
+every single file.
+"""
+
+_modes = ('copy', 'hardlink', 'reflink', 'auto')
+
+_FICLONE = 0x40049409  # _IOW(0x94, 9, int) from linux/fs.h.
+_UNSUPPORTED = {errno.EXDEV, errno.EPERM, errno.EINVAL, errno.ENOTTY, errno.ENOSYS, errno.EBADF, errno.EMLINK,
+                getattr(errno, 'EOPNOTSUPP', errno.EINVAL), getattr(errno, 'ENOTSUP', errno.EINVAL)}
+
+
+def _reflink(location: str, destination: str, failed: set) -> bool:
+    """
+    Clones the location into the destination with the `FICLONE` ioctl. Returns whether it worked.
+    """
+
+    if ioctl is None:
+        return False
+
+    with open(location, 'rb') as source, open(destination, 'wb') as target:
+        key = ('reflink', fstat(source.fileno()).st_dev, fstat(target.fileno()).st_dev)
+        if key in failed:
+            return False
+        try:
+            ioctl(target.fileno(), _FICLONE, source.fileno())
+        except OSError as error:
+            if error.errno not in _UNSUPPORTED:
+                raise
+            failed.add(key)
+            return False
+
+    copymode(location, destination)
+    return True
+
+
+def _copy_range(location: str, destination: str, failed: set) -> bool:
+    """
+    Copies the location into the destination with `os.copy_file_range`, which some filesystems turn into a clone.
+    Returns whether it worked.
+    """
+
+    if not hasattr(os, 'copy_file_range'):
+        return False
+
+    with open(location, 'rb') as source, open(destination, 'wb') as target:
+        key = ('copy_file_range', fstat(source.fileno()).st_dev, fstat(target.fileno()).st_dev)
+        if key in failed:
+            return False
+        size = fstat(source.fileno()).st_size
+        offset = 0
+        try:
+            while offset < size:
+                copied = os.copy_file_range(source.fileno(), target.fileno(), size - offset, offset, offset)
+                if copied == 0:
+                    break
+                offset += copied
+        except OSError as error:
+            if error.errno not in _UNSUPPORTED or offset:
+                raise
+            failed.add(key)
+            return False
+
+    copymode(location, destination)
+    return True
+
+
+def _hardlink(location: str, destination: str, failed: set) -> bool:
+    """
+    Hard links the destination to the location. Returns whether it worked.
+    """
+
+    key = ('hardlink', stat(location).st_dev, stat(dirname(destination) or '.').st_dev)
+    if key in failed:
+        return False
+
+    try:
+        link(location, destination)
+    except OSError as error:
+        if error.errno not in _UNSUPPORTED:
+            raise
+        failed.add(key)
+        return False
+
+    return True
+
+
+def materialize(location: str, destination: str, mode: str = 'copy', failed: set = None) -> str:
+    """
+    Puts a file at the destination with the same content as the location, using the mode passed, and returns the method
+    that was actually used. "auto" tries a reflink, then `copy_file_range`, then a plain copy; "hardlink" and "reflink"
+    fall back to a plain copy. The filesystems a mode failed between are added to the `failed` set, which is passed
+    again for the next files so the mode isn't tried between them anymore. Since an existing destination may be linked to another file (such as a source of a
+    previous build), it is removed first rather than written over.
+
+    Keep in mind a hard linked file is the source file itself: editing one edits the other.
+    """
+
+    if mode not in _modes:
+        raise ValueError(f'Unknown link mode {mode!r}. It must be one of: {", ".join(_modes)}.')
+    failed = failed if failed is not None else set()
+
+    try:
+        remove(destination)
+    except FileNotFoundError:
+        pass
+
+    if mode == 'hardlink' and _hardlink(location, destination, failed):
+        return 'hardlink'
+    if mode in ('reflink', 'auto') and _reflink(location, destination, failed):
+        return 'reflink'
+    if mode == 'auto' and _copy_range(location, destination, failed):
+        return 'copy_file_range'
+    copy(location, destination)
+    return 'copy'
@@ -1,114 +1,449 @@
-from shutil import copy, copytree
-from os import listdir, makedirs
-from os.path import join, isdir
-import sys
-
-
-_runtime_imports = ['locale', ]
-
-def _get_modules() -> tuple:
-    """
-    This function gets a list of all modules imported when loading a program.
-    """
-
-    import __main__  # Imports the module which will import all modules used in the program.
-
-    indices = []
-    mods = [m for m in sys.modules.keys()]
-    for i, mod in enumerate(mods):
-        for mod_ in mods:
-            if mod_ + '.' in mod:
-                indices.append(i)
-                break
-    
-    for i in reversed(indices):
-        mods.pop(i)
-    mods.pop(mods.index('__main__'))
-    if __name__ != '__main__':
-        mods.pop(mods.index(__name__))
-    
-    mods.extend(_runtime_imports)
-    return mods
-
-
-def _get_python_path() -> str:
-    """
-    Returns the path to Python's installation directory.
-    """
-
-    version = ''.join(sys.version.split(' ')[0].split('.')[:-1])  # Gets a three number string according to the version. Python 3.11.4 would be 311.
-    for path in sys.path:
-        if f'Python{version}' in path[-len(f'Python{version}'):]:
-            return path
-            break
-    
-    raise FileNotFoundError("The program was unable to locate Python's installation directory.")
-
-
-def _from_python_dir(output: str, folder: str) -> None:
-    """
-    Goes into the specified folder in the PYTHONPATH and copies the modules inside that matches the ones specified in the module list.
-    """
-
-    python_path = _get_python_path()
-    modules = _get_modules()
-
-    for file in listdir(join(python_path, folder)):
-        if isdir(join(python_path, folder, file)) and file in modules:
-            try:
-                copytree(join(python_path, folder, file), join(join(output, folder, file)))
-            except FileNotFoundError:
-                makedirs(join(output, folder))
-                copytree(join(python_path, folder, file), join(join(output, folder, file)))
-            except FileExistsError:
-                print('Subdirectory has already been copied to the output directory. Ignoring it.')
-
-        if not isdir(join(python_path, folder, file)) and file.split('.')[0] in modules:  # Sometimes there are files and directories with the same name so `elif` can't be used.
-            try:
-                copy(join(python_path, folder, file), join(join(output, folder, file)))
-            except FileNotFoundError:
-                makedirs(join(output, folder))
-                copy(join(python_path, folder, file), join(join(output, folder, file)))
-            except FileExistsError:
-                print('File has already been copied to the output directory. Ignoring it.')
-
-def copy_python(output: str) -> None:
-    """
-    Copies a Python interpreter with the bare essentials to the output file. This function should be used inside a `setup.py` file which imports the
-    project's `main.py` file and `PyToPyc`. If the project uses modules that happen to be imported inside functions and not at the top of the file, then
-    there will be a need to update the _runtime_imports parameter located in this module's `__init__.py` file first. If that's not done, the program won't
-    be able to tell it's supposed to import those modules as well.
-    """
-
-    python_path = _get_python_path()
-    files = [file for file in listdir(python_path) if not isdir(join(python_path, file))]
-    for file in files:
-        try:
-            copy(join(python_path, file), join(output, file))
-        except FileNotFoundError:
-            makedirs(output)
-            copy(join(python_path, file), join(output, file))
-        except FileExistsError:
-            print('File has already been copied to the output directory. Ignoring it.')
-
-    _from_python_dir(output, 'DLLs')
-    _from_python_dir(output, 'Lib')
-    _from_python_dir(output, 'Tools\\demo')
-    _from_python_dir(output, 'Tools\\i18n')
-    _from_python_dir(output, 'Tools\\scripts')
-
-    try:
-        copytree(join(python_path, 'libs'), join(output, 'libs'))
-    except FileNotFoundError:
-        makedirs(join(output, 'libs'))
-        copytree(join(python_path, 'libs'), join(output, 'libs'))
-    except FileExistsError:
-        print('Subdirectory has already been copied to the output directory. Ignoring it.')
-    
-    try:
-        copytree(join(python_path, 'Scripts'), join(output, 'Scripts'))
-    except FileNotFoundError:
-        makedirs(join(output, 'Scripts'))
-        copytree(join(python_path, 'Scripts'), join(output, 'Scripts'))
-    except FileExistsError:
-        print('Subdirectory has already been copied to the output directory. Ignoring it.')
+from concurrent.futures import ProcessPoolExecutor
+from importlib.util import MAGIC_NUMBER
+from shutil import copytree
+from functools import partial
+from os import listdir, makedirs, walk, sep, scandir
+from os.path import join, isdir, exists, relpath, splitext, basename, dirname
+from subprocess import run
+from types import CodeType
+import linking
+import tracing
+import ignore
+import sysconfig
+import marshal
+import ast
+import dis
+import sys
+
+
+_runtime_imports = ['locale', ]
+_whole_packages = ['encodings', 'dbm']  # Their submodules are imported by name at runtime (codecs look up encodings.<codec>), so they're kept whole.
+_test_dirs = {'test', 'tests', 'idle_test'}
+
+
+def _code_imports(code: CodeType) -> list:
+    """
+    Returns the `(name, level, fromlist)` of every `IMPORT_NAME` instruction in a code object and in the code objects nested
+    inside it, such as those of functions and classes.
+    """
+
+    imports = []
+    stack = [code]
+    while stack:
+        code = stack.pop()
+        instructions = list(dis.get_instructions(code))
+        for i, instruction in enumerate(instructions):
+            if instruction.opname == 'IMPORT_NAME':  # The level and the fromlist are the two constants loaded right before it.
+                level = instructions[i - 2].argval if i > 1 and instructions[i - 2].opname == 'LOAD_CONST' else 0
+                fromlist = instructions[i - 1].argval if i > 0 and instructions[i - 1].opname == 'LOAD_CONST' else None
+                imports.append((instruction.argval, level or 0, tuple(fromlist or ())))
+
+        stack.extend(const for const in code.co_consts if isinstance(const, CodeType))
+
+    return imports
+
+
+def _scan_imports(path: str) -> list:
+    """
+    Returns the `(name, level, fromlist)` of every import statement in a source (`.py`) or bytecode (`.pyc`) file, including
+    the ones made inside functions and under conditions. Files that can't be parsed, or bytecode compiled by another
+    version of Python, are taken as importing nothing.
+    """
+
+    with open(path, 'rb') as file:
+        data = file.read()
+
+    if path[-4:] == '.pyc':
+        if data[:4] != MAGIC_NUMBER:
+            return []
+        try:
+            return _code_imports(marshal.loads(data[16:]))
+        except (ValueError, EOFError, TypeError):
+            return []
+
+    try:
+        tree = ast.parse(data, path)
+    except (SyntaxError, ValueError):
+        return []
+
+    imports = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.extend((alias.name, 0, ()) for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            imports.append((node.module or '', node.level, tuple(alias.name for alias in node.names)))
+
+    return imports
+
+
+def _resolve(imports: list, package: str) -> set:
+    """
+    Turns the imports scanned from a module into absolute module names. Relative imports are resolved against the
+    module's package, the parents of every imported module are included (importing `a.b` imports `a` too) and the names
+    in a `from` import are included as well, since they might be submodules.
+    """
+
+    names = set()
+    for name, level, fromlist in imports:
+        if level:
+            base = package.rsplit('.', level - 1)[0] if level > 1 else package
+            name = f'{base}.{name}' if name else base
+        if not name:
+            continue
+
+        parts = name.split('.')
+        names.update('.'.join(parts[:i]) for i in range(1, len(parts) + 1))
+        names.update(f'{name}.{from_}' for from_ in fromlist if from_ != '*')
+
+    return names
+
+
+def _index_modules(directory: str, rules: tuple = None) -> dict:
+    """
+    Maps the name of every module in a directory tree to its file, be it source or, if the source isn't there, the
+    bytecode left in a `__pycache__` folder. The files and folders the filter rules leave out (see `ignore.load`, by
+    default the directory's own rules) are skipped as the build skips them, left out folders never being walked into.
+    """
+
+    rules = rules if rules is not None else ignore.load(directory)
+    modules = {}
+    for root, dirs, files in walk(directory):
+        relative = relpath(root, directory)
+        parts = [] if relative == '.' else relative.split(sep)
+        if parts and parts[-1] == '__pycache__':
+            parts.pop()
+        folder = sep.join(parts)
+        dirs[:] = [name for name in dirs if name == '__pycache__' or not ignore.excluded(rules, join(folder, name), True)]
+
+        for file in files:
+            name, extension = splitext(file)
+            if extension not in ('.py', '.pyc'):
+                continue
+
+            name = name.split('.')[0]  # Takes the interpreter's suffix out of the bytecode's name.
+            if ignore.excluded(rules, join(folder, f'{name}.py')):  # Bytecode is matched by the name of its source.
+                continue
+            module = '.'.join(parts if name == '__init__' else parts + [name])
+            if module and (extension == '.py' or module not in modules):
+                modules[module] = join(root, file)
+
+    return modules
+
+
+def _find_stdlib(stdlib: str, name: str) -> str:
+    """
+    Returns the source file of a standard library module, or None if it has none (built-in and extension modules).
+    """
+
+    path = join(stdlib, *name.split('.'))
+    for file in (path + '.py', join(path, '__init__.py')):
+        if exists(file):
+            return file
+
+    return None
+
+
+def _import_graph(project: str, entry: str = None, workers: int = None, rules: tuple = None) -> tuple:
+    """
+    Statically finds every standard library module the project can import, directly or through other modules. The
+    project's files are read for their import statements without ever running them, starting from the entry module if
+    one is given or from every module in the project otherwise, and the standard library modules found are read in
+    turn until no new module shows up. The files are read in parallel on a process pool of `workers` processes, if
+    there's more than one. The project's files the filter rules leave out aren't read (see `_index_modules`).
+    Returns the standard library modules found and a dictionary mapping the project's modules reached to their files, both
+    in the order they were found, which is close to the order they are imported in.
+    """
+
+    stdlib = sysconfig.get_paths()['stdlib']
+    local = _index_modules(project, rules)
+    found = {}
+
+    if entry is not None:
+        if entry not in local:
+            raise ValueError(f'The program was unable to find the module {entry} in {project}.')
+        frontier = {local[entry]: entry}
+    else:
+        frontier = {path: module for module, path in local.items()}
+    reached = {module: path for path, module in frontier.items()}
+    seen = set(frontier)
+
+    pool = ProcessPoolExecutor(workers) if workers is not None and workers > 1 else None
+    try:
+        while frontier:
+            scanned = pool.map(_scan_imports, frontier, chunksize=16) if pool else map(_scan_imports, frontier)
+            next_frontier = {}
+            for (path, module), imports in zip(frontier.items(), scanned):
+                package = module if basename(path).split('.')[0] == '__init__' else module.rpartition('.')[0]
+                for name in _resolve(imports, package):
+                    if name in local:
+                        file = reached[name] = local[name]
+                    elif name.split('.')[0] in sys.stdlib_module_names:
+                        found[name] = None
+                        file = _find_stdlib(stdlib, name)
+                    else:
+                        continue
+
+                    if file is not None and file not in seen:
+                        seen.add(file)
+                        next_frontier[file] = name
+            frontier = next_frontier
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return found, reached
+
+
+def _reachable(local: dict, roots: list, workers: int = None) -> dict:
+    """
+    Returns the modules of a project reached from the roots passed, directly or through other modules, in the order
+    they were found, mapped to their files. The project's modules are passed mapped to their files, source or bytecode,
+    which are read for their imports as `_import_graph` reads them, on a process pool of `workers` processes if there's
+    more than one. A root
+    that is a package reaches every module under it, for the packages whose modules are imported by name. The standard
+    library isn't followed, since it never imports the project.
+    """
+
+    frontier = {}
+    for root in roots:
+        frontier.update((path, module) for module, path in local.items() if module == root or module.startswith(f'{root}.'))
+    reached = {module: path for path, module in frontier.items()}
+
+    pool = ProcessPoolExecutor(workers) if workers is not None and workers > 1 and len(local) > 1 else None
+    try:
+        while frontier:
+            scanned = pool.map(_scan_imports, frontier, chunksize=16) if pool else map(_scan_imports, frontier)
+            next_frontier = {}
+            for (path, module), imports in zip(frontier.items(), scanned):
+                package = module if basename(path).split('.')[0] == '__init__' else module.rpartition('.')[0]
+                for name in _resolve(imports, package):
+                    if name in local and name not in reached:
+                        reached[name] = local[name]
+                        next_frontier[local[name]] = name
+            frontier = next_frontier
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return reached
+
+
+def _startup_modules() -> list:
+    """
+    Returns the modules the interpreter imports by itself when starting up, which no program imports explicitly. They
+    are read from a bare interpreter, so no code of the program is run. Modules imported by `.pth` files from the
+    site-packages are among them.
+    """
+
+    code = 'import sys; print("\\n".join(sys.modules))'
+    return run([sys.executable, '-I', '-c', code], capture_output=True, text=True, check=True).stdout.split()
+
+
+def _get_modules(project: str = None, entry: str = None, workers: int = None, submodules: bool = False,
+                 profile: dict = None, graph: tuple = None) -> list:
+    """
+    This function gets a list of all the top-level standard library modules a program needs. If the project's directory
+    is given, they are found by statically reading its imports (see `_import_graph`); otherwise, they are the modules
+    imported when loading the program (see `_get_loaded_modules`). If `submodules` is set, the submodules needed are
+    listed as well, by their full name, so that only them can be copied (see `_stdlib_files`).
+
+    If a profile of the modules the program imported when it was run is passed (see the `tracing` module), its standard
+    library modules are added to the ones read from the imports, in place of the `_runtime_imports`, which only stand in
+    for the modules imported at runtime it holds. Without a project, the profile is used instead of loading the program.
+    The import graph of the project can be passed if it was already read.
+    """
+
+    if project is None and profile is not None:
+        modules = [module for module in _startup_modules() if module.split('.')[0] in sys.stdlib_module_names]
+    elif project is None:
+        modules = _get_loaded_modules(submodules)
+    else:
+        modules = [module for module in _startup_modules() if module.split('.')[0] in sys.stdlib_module_names]
+        modules.extend((graph if graph is not None else _import_graph(project, entry, workers))[0])
+    if profile is not None:  # Read from the profile's index, a package at a time.
+        index = tracing.index(profile)
+        modules.extend(module for top in index if top in sys.stdlib_module_names for module in tracing.under(index, top))
+    elif project is not None:
+        modules.extend(_runtime_imports)
+
+    if submodules:  # Names imported from a module (`from json.decoder import JSONDecoder`) are read as possible submodules.
+        stdlib = sysconfig.get_paths()['stdlib']
+        modules = [module for module in modules if '.' not in module or _find_stdlib(stdlib, module) is not None]
+    else:
+        modules = tracing.top_level(modules)
+    return [module for module in dict.fromkeys(modules) if module != '__main__']  # In the order they are imported.
+
+
+def _get_loaded_modules(submodules: bool = False) -> list:
+    """
+    This function gets a list of all modules imported when loading a program. Submodules are left out, unless asked for.
+    """
+
+    import __main__  # Imports the module which will import all modules used in the program.
+
+    tree = tracing._tree(name for name in sys.modules if name not in ('__main__', __name__))
+    mods = [module for top in tree for module in tracing.under(tree, top)] if submodules else list(tree)
+
+    mods.extend(_runtime_imports)
+    return mods
+
+
+def _get_python_path() -> str:
+    """
+    Returns the path to Python's installation directory.
+    """
+
+    version = ''.join(sys.version.split(' ')[0].split('.')[:-1])  # Gets a three number string according to the version. Python 3.11.4 would be 311.
+    for path in sys.path:
+        if f'Python{version}' in path[-len(f'Python{version}'):]:
+            return path
+            break
+    
+    raise FileNotFoundError("The program was unable to locate Python's installation directory.")
+
+
+def _from_python_dir(output: str, folder: str, modules: list, link_mode: str = 'copy') -> None:
+    """
+    Goes into the specified folder in the PYTHONPATH and copies the modules inside that matches the ones specified in the module list.
+    """
+
+    python_path = _get_python_path()
+    copy = partial(linking.materialize, mode=link_mode, failed=set())
+
+    for file in listdir(join(python_path, folder)):
+        if isdir(join(python_path, folder, file)) and file in modules:
+            try:
+                copytree(join(python_path, folder, file), join(join(output, folder, file)), copy_function=copy)
+            except FileNotFoundError:
+                makedirs(join(output, folder))
+                copytree(join(python_path, folder, file), join(join(output, folder, file)), copy_function=copy)
+            except FileExistsError:
+                print('Subdirectory has already been copied to the output directory. Ignoring it.')
+
+        if not isdir(join(python_path, folder, file)) and file.split('.')[0] in modules:  # Sometimes there are files and directories with the same name so `elif` can't be used.
+            try:
+                copy(join(python_path, folder, file), join(join(output, folder, file)))
+            except FileNotFoundError:
+                makedirs(join(output, folder))
+                copy(join(python_path, folder, file), join(join(output, folder, file)))
+            except FileExistsError:
+                print('File has already been copied to the output directory. Ignoring it.')
+
+def _stdlib_files(lib: str, modules: list) -> list:
+    """
+    Returns the files of the standard library folder to copy for the modules passed, by their full names, relative to
+    the folder: the files of the modules themselves, the `__init__.py` of every package on their way, and the data files
+    of those packages (their files that aren't Python, and their folders that aren't packages). Subpackages no module
+    was needed from are left out, and so are the test folders. The packages in `_whole_packages` and `_runtime_imports`
+    are copied whole, but for their tests.
+    """
+
+    wanted = set()
+    for module in modules:
+        parts = module.split('.')
+        wanted.update('.'.join(parts[:i]) for i in range(1, len(parts) + 1))
+    whole = set(_whole_packages) | set(_runtime_imports)
+
+    files = []
+    for name in dict.fromkeys(module.split('.')[0] for module in modules):
+        if exists(join(lib, f'{name}.py')):
+            files.append(f'{name}.py')
+        if not exists(join(lib, name, '__init__.py')):
+            continue
+
+        stack = [name]
+        while stack:
+            package = stack.pop()
+            with scandir(join(lib, *package.split('.'))) as entries:
+                for entry in entries:
+                    relative = relpath(entry.path, lib)
+                    if entry.is_dir():
+                        if entry.name == '__pycache__' or entry.name in _test_dirs and f'{package}.{entry.name}' not in wanted:
+                            continue
+                        if exists(join(entry.path, '__init__.py')):
+                            if name in whole or f'{package}.{entry.name}' in wanted:
+                                stack.append(f'{package}.{entry.name}')
+                        else:  # A data folder.
+                            for root, dirs, data in walk(entry.path):
+                                dirs[:] = [folder for folder in dirs if folder != '__pycache__' and folder not in _test_dirs]
+                                files.extend(relpath(join(root, file), lib) for file in data)
+                    elif entry.name[-3:] == '.py':
+                        if entry.name == '__init__.py' or name in whole or f'{package}.{entry.name[:-3]}' in wanted:
+                            files.append(relative)
+                    elif entry.name[-4:] != '.pyc':
+                        files.append(relative)
+
+    return files
+
+
+def _from_stdlib(output: str, modules: list, link_mode: str = 'copy') -> None:
+    """
+    Copies the files of the standard library the modules passed need (see `_stdlib_files`) into the `Lib` folder of the
+    output.
+    """
+
+    lib = join(_get_python_path(), 'Lib')
+    copy = partial(linking.materialize, mode=link_mode, failed=set())
+
+    for file in _stdlib_files(lib, modules):
+        makedirs(dirname(join(output, 'Lib', file)), exist_ok=True)
+        copy(join(lib, file), join(output, 'Lib', file))
+
+
+def copy_python(output: str, project: str = None, entry: str = None, workers: int = None, link_mode: str = 'copy',
+                modules: list = None, submodules: bool = True, profile: dict = None) -> list:
+    """
+    Copies a Python interpreter with the bare essentials to the output file. If the project's directory is passed (and, optionally, the name of its
+    entry module), the modules it needs are found by reading its imports without running it. Otherwise, this function should be used inside a
+    `setup.py` file which imports the project's `main.py` file and `PyToPyc`. If the project uses modules that happen to be imported inside functions
+    and not at the top of the file, then there will be a need to update the _runtime_imports parameter located in this module's `__init__.py` file
+    first. If that's not done, the program won't be able to tell it's supposed to import those modules as well.
+    The files can be hard linked or reflinked instead of copied through the link mode (see the `linking` module).
+    If the modules to copy were already found, they can be passed instead of the project.
+    Only the submodules of the standard library that are needed are copied (see `_stdlib_files`), unless `submodules` is
+    turned off, in which case the modules are taken as top-level names and their packages are copied whole.
+    A profile of the modules the program imported when run can be passed (see `_get_modules`).
+    Returns the list of modules that were copied.
+    """
+
+    python_path = _get_python_path()
+    copy = partial(linking.materialize, mode=link_mode, failed=set())
+    if modules is None:
+        modules = _get_modules(project, entry, workers, submodules, profile)
+    top_level = list(dict.fromkeys(module.split('.')[0] for module in modules))
+    files = [file for file in listdir(python_path) if not isdir(join(python_path, file))]
+    for file in files:
+        try:
+            copy(join(python_path, file), join(output, file))
+        except FileNotFoundError:
+            makedirs(output)
+            copy(join(python_path, file), join(output, file))
+        except FileExistsError:
+            print('File has already been copied to the output directory. Ignoring it.')
+
+    _from_python_dir(output, 'DLLs', top_level, link_mode)
+    if submodules:
+        _from_stdlib(output, modules, link_mode)
+    else:
+        _from_python_dir(output, 'Lib', top_level, link_mode)
+    _from_python_dir(output, 'Tools\\demo', top_level, link_mode)
+    _from_python_dir(output, 'Tools\\i18n', top_level, link_mode)
+    _from_python_dir(output, 'Tools\\scripts', top_level, link_mode)
+
+    try:
+        copytree(join(python_path, 'libs'), join(output, 'libs'), copy_function=copy)
+    except FileNotFoundError:
+        makedirs(join(output, 'libs'))
+        copytree(join(python_path, 'libs'), join(output, 'libs'), copy_function=copy)
+    except FileExistsError:
+        print('Subdirectory has already been copied to the output directory. Ignoring it.')
+    
+    try:
+        copytree(join(python_path, 'Scripts'), join(output, 'Scripts'), copy_function=copy)
+    except FileNotFoundError:
+        makedirs(join(output, 'Scripts'))
+        copytree(join(python_path, 'Scripts'), join(output, 'Scripts'), copy_function=copy)
+    except FileExistsError:
+        print('Subdirectory has already been copied to the output directory. Ignoring it.')
+
+    return modules
@@ -0,0 +1,197 @@
+from contextlib import contextmanager
+from threading import Lock, local
+from time import perf_counter
+from os import replace
+from heapq import heappush, heappushpop
+import json
+import sys
+
+
+"""
+Gathers what a build did into a report that can be read by a program rather than a person: how long each phase of the
+build took, how many files and bytes went through it, which files took the longest and how much memory the build
+peaked at. Nothing is gathered unless a report was started, so the phases cost a single check otherwise.
+
+The time of a phase doesn't include the time of the phases run inside of it, so the phases add up to the whole build.
+Files copied on a thread pool are counted in the phase they belong to ("bytecode copy" or "misc copy"), along with the
+time spent copying each of them, while the time the build spends copying them all is the "copy" phase.
+"""
+
+
+def _peak_memory() -> int:
+    """
+    Returns the most memory the process has used so far, in bytes, or None if it can't be told.
+    """
+
+    try:
+        import resource
+    except ImportError:  # Windows.
+        try:
+            from ctypes import wintypes, windll, Structure, sizeof, byref, c_size_t
+
+            class _Counters(Structure):
+                _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                            ('PeakWorkingSetSize', c_size_t), ('WorkingSetSize', c_size_t),
+                            ('QuotaPeakPagedPoolUsage', c_size_t), ('QuotaPagedPoolUsage', c_size_t),
+                            ('QuotaPeakNonPagedPoolUsage', c_size_t), ('QuotaNonPagedPoolUsage', c_size_t),
+                            ('PagefileUsage', c_size_t), ('PeakPagefileUsage', c_size_t)]
+
+            counters = _Counters()
+            counters.cb = sizeof(counters)
+            process = windll.kernel32.GetCurrentProcess()
+            if windll.psapi.GetProcessMemoryInfo(process, byref(counters), counters.cb):
+                return counters.PeakWorkingSetSize
+        except (ImportError, OSError, AttributeError):
+            pass
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # Linux reports kilobytes, macOS bytes.
+
+
+class Report:
+    """
+    A report being gathered. Each builder gathers into a report of its own (see `bytecode.Builder`), so that builds run
+    at the same time never reset or stop each other's; the functions of this module gather into the `default` one, the
+    report of the program run from the command line.
+    """
+
+    def __init__(self):
+        self.active = False
+        self._start = None
+        self._phases = {}
+        self._slowest = []
+        self._slowest_count = 10
+        self._lock = Lock()
+        self._stack = local()
+        self._sections = {}
+
+    def start(self, slowest: int = 10) -> None:
+        """
+        Starts gathering the report, forgetting any previous one. The `slowest` files taking the longest are kept.
+        """
+
+        self.active = True
+        self._start = perf_counter()
+        self._phases = {}
+        self._sections = {}
+        self._slowest = []
+        self._slowest_count = slowest
+
+    def _record(self, name: str) -> dict:
+        """
+        Returns the record of a phase, creating it the first time the phase is seen. Must be called holding the lock.
+        """
+
+        record = self._phases.get(name)
+        if record is None:
+            record = self._phases[name] = {'seconds': 0.0, 'files': 0, 'bytes': 0, 'file_seconds': 0.0}
+
+        return record
+
+    def add(self, name: str, seconds: float = 0.0, files: int = 0, size: int = 0) -> None:
+        """
+        Adds time, files and bytes to a phase. The time is left out of the phase this is called in, if any.
+        """
+
+        if not self.active:
+            return
+
+        nested = getattr(self._stack, 'nested', None)
+        if nested:
+            nested[-1] += seconds
+        self._add(name, seconds, files, size)
+
+    def _add(self, name: str, seconds: float = 0.0, files: int = 0, size: int = 0) -> None:
+        """
+        Adds time, files and bytes to a phase.
+        """
+
+        with self._lock:
+            record = self._record(name)
+            record['seconds'] += seconds
+            record['files'] += files
+            record['bytes'] += size
+
+    def count_file(self, name: str, path: str, size: int, seconds: float) -> None:
+        """
+        Counts a file handled by a phase, which may be running on another thread, and keeps it if it's one of the
+        slowest.
+        """
+
+        if not self.active:
+            return
+
+        with self._lock:
+            record = self._record(name)
+            record['files'] += 1
+            record['bytes'] += size
+            record['file_seconds'] += seconds
+            if len(self._slowest) < self._slowest_count:
+                heappush(self._slowest, (seconds, path, name))
+            elif self._slowest and seconds > self._slowest[0][0]:
+                heappushpop(self._slowest, (seconds, path, name))
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Times the code run inside the `with` block as a phase, leaving out the time of the phases nested in it.
+        """
+
+        if not self.active:
+            yield
+            return
+
+        if not hasattr(self._stack, 'nested'):
+            self._stack.nested = []
+        self._stack.nested.append(0.0)
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = perf_counter() - start
+            nested = self._stack.nested.pop()
+            if self._stack.nested:
+                self._stack.nested[-1] += elapsed
+            self._add(name, elapsed - nested)
+
+    def attach(self, name: str, section) -> None:
+        """
+        Adds a section of its own to the report, such as the startup profile of the packaged program, under the name
+        passed.
+        """
+
+        if self.active:
+            self._sections[name] = section
+
+    def finish(self, callback=None, path: str = None) -> dict:
+        """
+        Stops gathering the report and returns it. It is also passed to the callback and written as JSON to the path, if
+        either is given.
+        """
+
+        self.active = False
+
+        result = {
+            'seconds': perf_counter() - self._start if self._start is not None else 0.0,
+            'peak_memory': _peak_memory(),
+            'phases': {name: dict(record) for name, record in self._phases.items()},
+            'slowest_files': [{'path': file, 'phase': name, 'seconds': seconds}
+                              for seconds, file, name in sorted(self._slowest, reverse=True)],
+            **self._sections,
+        }
+
+        if callback is not None:
+            callback(result)
+
+        if path is not None:
+            with open(path + '.tmp', 'w', encoding='utf-8') as file:
+                json.dump(result, file, indent=2)
+            replace(path + '.tmp', path)
+
+        return result
+
+
+default = Report()
+# The command line gathers into the default report through these.
+start, add, count_file, phase, attach, finish = default.start, default.add, default.count_file, default.phase, default.attach, default.finish
@@ -0,0 +1,245 @@
+from concurrent.futures import ProcessPoolExecutor
+from importlib.util import MAGIC_NUMBER, source_hash
+from os import replace
+from types import CodeType
+import marshal
+import dis
+import sys
+
+
+"""
+Reduces the size of bytecode files by taking out of their code objects what a release doesn't need: the docstrings left behind when the
+sources weren't compiled with `-OO` and, optionally, the line tables, which are only used for tracebacks and debuggers. Constants are also
+interned and deduplicated across the whole file, so that marshal writes each repeated constant only once.
+
+The header of the bytecode can also be rewritten into an unchecked hash-based one (PEP 552), which the interpreter
+never checks against the sources, instead of one recording the modification time and size of the source it was
+compiled from. Only bytecode whose magic number is the one of the interpreter it's built for is rewritten; anything else
+is an error, since the interpreter would refuse to load it.
+"""
+
+_CO_NEWLOCALS = 0x2
+_LOAD_CONSTS = set(dis.hasconst)
+_FLAG_HASH = 0b01
+# The magic numbers of the final releases of CPython, by cache tag. There is no hash-based bytecode before 3.7.
+_magic_numbers = {'cpython-37': 3394, 'cpython-38': 3413, 'cpython-39': 3425, 'cpython-310': 3439, 'cpython-311': 3495,
+                  'cpython-312': 3531, 'cpython-313': 3571}
+
+
+def _const_key(const) -> tuple:
+    """
+    Returns a key that is the same for two constants only if they can be used in place of one another. Comparing them
+    by value isn't enough: `0.0 == -0.0` and `1 == True`, so the types are compared as well and anything other than
+    strings, bytes and integers is compared by its marshalled form.
+    """
+
+    if type(const) in (str, bytes, int):
+        return type(const), const
+
+    return type(const), marshal.dumps(const)
+
+
+def _docstring_indices(code: CodeType, instructions: list) -> set:
+    """
+    Returns the indices in `co_consts` of the docstrings of a code object: the first constant of a function and the
+    constants stored into `__doc__` by the body of a module or a class. A constant that is also loaded somewhere else
+    isn't a docstring only, so it is left alone.
+    """
+
+    loads = {}
+    for instruction in instructions:
+        if instruction.opcode in _LOAD_CONSTS:
+            loads[instruction.arg] = loads.get(instruction.arg, 0) + 1
+
+    indices = set()
+    if code.co_flags & _CO_NEWLOCALS:  # Functions, but also lambdas and comprehensions, which have no docstrings.
+        if code.co_name[0] != '<' and code.co_consts and isinstance(code.co_consts[0], str) and 0 not in loads:
+            indices.add(0)
+    else:
+        for previous, instruction in zip(instructions, instructions[1:]):
+            if instruction.opname == 'STORE_NAME' and instruction.argval == '__doc__' and previous.opname == 'LOAD_CONST':
+                if loads[previous.arg] == 1 and isinstance(code.co_consts[previous.arg], str):
+                    indices.add(previous.arg)
+
+    return indices
+
+
+def _blank_linetable(code: CodeType) -> bytes:
+    """
+    Returns a location table that puts every instruction of the code object on its first line, which is two bytes for
+    every eight instructions. An empty table would break the `traceback` module.
+    """
+
+    units = len(code.co_code) // 2
+    table = bytearray()
+    while units > 0:
+        length = min(units, 8)
+        table += bytes((0x80 | (13 << 3) | (length - 1), 0))  # "No column" entry whose line is the previous one plus zero.
+        units -= length
+
+    return bytes(table)
+
+
+def _shrink_code(code: CodeType, lines: bool, constants: dict) -> CodeType:
+    """
+    Returns the code object, and the ones nested in it, without docstrings and, if `lines` is set, without line tables,
+    with its constants and names interned and deduplicated through the `constants` dictionary.
+    """
+
+    docstrings = _docstring_indices(code, list(dis.get_instructions(code)))
+    consts = []
+    for i, const in enumerate(code.co_consts):
+        if i in docstrings:
+            const = None
+        elif isinstance(const, CodeType):
+            const = _shrink_code(const, lines, constants)
+        else:
+            if isinstance(const, str):
+                const = sys.intern(const)
+            const = constants.setdefault(_const_key(const), const)
+        consts.append(const)
+
+    changes = {
+        'co_consts': tuple(consts),
+        'co_names': tuple(sys.intern(name) for name in code.co_names),
+        'co_varnames': tuple(sys.intern(name) for name in code.co_varnames),
+    }
+    if lines and sys.version_info >= (3, 11):  # The format of the table changed in 3.11.
+        changes['co_linetable'] = _blank_linetable(code)
+
+    return code.replace(**changes)
+
+
+def magic_number(tag: str = None) -> bytes:
+    """
+    Returns the magic number of the bytecode of the interpreter a cache tag (or a suffix) stands for, such as
+    `cpython-312.opt-2`, or of the interpreter running PyToPyc if no tag is passed. Raises ValueError for the
+    interpreters whose bytecode can't be hash-based, or whose magic number isn't known.
+    """
+
+    tag = (tag or sys.implementation.cache_tag).lstrip('.').split('.')[0]
+    if tag == sys.implementation.cache_tag:
+        return MAGIC_NUMBER
+    if tag not in _magic_numbers:
+        raise ValueError(f'Unchecked hash-based bytecode can only be written for CPython 3.7 and later, not for {tag}.')
+
+    return _magic_numbers[tag].to_bytes(2, 'little') + b'\r\n'
+
+
+def unchecked_header(data: bytes, magic: bytes = MAGIC_NUMBER, source: bytes = None) -> bytes:
+    """
+    Returns the content of a bytecode file with an unchecked hash-based header. The hash of bytecode that was already
+    hash-based is kept; otherwise it is the hash of the source, if passed, or of the code, since there is no source to
+    hash, which is then only there for the bytecode to be the same whenever the code is. Raises ValueError if the
+    bytecode doesn't start with the magic number passed.
+    """
+
+    if data[:4] != magic:
+        raise ValueError(f'The bytecode has the magic number {int.from_bytes(data[:2], "little")}, but the interpreter it '
+                         f'is built for expects {int.from_bytes(magic[:2], "little")}.')
+
+    flags = int.from_bytes(data[4:8], 'little')
+    if flags == _FLAG_HASH:
+        return data
+    digest = data[8:16] if flags & _FLAG_HASH else source_hash(data[16:] if source is None else source)
+
+    return magic + _FLAG_HASH.to_bytes(4, 'little') + digest + data[16:]
+
+
+def shrink_data(data: bytes, lines: bool = False, code: bool = True, magic: bytes = None) -> bytes:
+    """
+    Returns the content of a bytecode file reduced in size, unless `code` is turned off. The 16-byte header is kept as
+    it is, unless a magic number is passed, in which case it is made an unchecked hash-based one (see
+    `unchecked_header`). Bytecode compiled by another version of Python can't be read by this one, so its code is
+    returned untouched, as is code that didn't get any smaller.
+    """
+
+    if magic is not None:
+        data = unchecked_header(data, magic)
+    if not code or data[:4] != MAGIC_NUMBER:
+        return data
+
+    code = _shrink_code(marshal.loads(data[16:]), lines, {})
+    shrunk = data[:16] + marshal.dumps(code)
+    return shrunk if len(shrunk) < len(data) else data
+
+
+def shrink_file(path: str, lines: bool = False, code: bool = True, magic: bytes = None) -> tuple:
+    """
+    Reduces the size of a bytecode file (see `shrink_data`) and returns its size before and after. The file is replaced
+    rather than written over, so that a file linked to another one (such as the bytecode it was copied from) is never
+    modified.
+    """
+
+    with open(path, 'rb') as file:
+        data = file.read()
+
+    try:
+        shrunk = shrink_data(data, lines, code, magic)
+    except ValueError as error:
+        raise ValueError(f'{path}: {error}') from None
+    if shrunk is not data:
+        with open(path + '.tmp', 'wb') as file:
+            file.write(shrunk)
+        replace(path + '.tmp', path)
+
+    return len(data), len(shrunk)
+
+
+def _shrink_content(content, lines: bool, code: bool = True, magic: bytes = None) -> tuple:
+    """
+    Reduces the size of a bytecode file's content, given either as bytes or as the path to the file, and returns its
+    size before and the reduced content.
+    """
+
+    if not isinstance(content, bytes):
+        with open(content, 'rb') as file:
+            data = file.read()
+        try:
+            return len(data), shrink_data(data, lines, code, magic)
+        except ValueError as error:
+            raise ValueError(f'{content}: {error}') from None
+
+    return len(content), shrink_data(content, lines, code, magic)
+
+
+def shrink_entries(entries: list, lines: bool = False, workers: int = None, code: bool = True, magic: bytes = None) -> tuple:
+    """
+    Reduces the size of the bytecode in a list of archive entries, pairs of a name and either the path to the file or
+    its content (see `archive.write_zip`), spreading them across a process pool of `workers` processes if there's more
+    than one (by default, they're shrunk one after the other). The files
+    themselves are never modified. Returns the entries with the reduced content, and the total size before and after.
+    The code and the magic number are passed on to `shrink_data`.
+    """
+
+    bytecode = [i for i, (arcname, content) in enumerate(entries) if arcname[-4:] == '.pyc']
+    contents = [entries[i][1] for i in bytecode]
+    if workers is None or workers <= 1:
+        results = [_shrink_content(content, lines, code, magic) for content in contents]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(_shrink_content, contents, [lines] * len(contents), [code] * len(contents),
+                                    [magic] * len(contents), chunksize=16))
+
+    entries = list(entries)
+    for i, (before, shrunk) in zip(bytecode, results):
+        entries[i] = (entries[i][0], shrunk)
+
+    return entries, sum(before for before, shrunk in results), sum(len(shrunk) for before, shrunk in results)
+
+
+def shrink(paths: list, lines: bool = False, workers: int = None, code: bool = True, magic: bytes = None) -> tuple:
+    """
+    Reduces the size of every bytecode file passed, spreading them across a process pool of `workers` processes if
+    there's more than one (by default, they're shrunk one after the other), and returns their total size before and
+    after. The code and the magic number are passed on to `shrink_data`.
+    """
+
+    if workers is None or workers <= 1:
+        sizes = [shrink_file(path, lines, code, magic) for path in paths]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            sizes = list(pool.map(shrink_file, paths, [lines] * len(paths), [code] * len(paths), [magic] * len(paths),
+                                  chunksize=16))
+
+    return sum(before for before, after in sizes), sum(after for before, after in sizes)
@@ -0,0 +1,261 @@
+from zipfile import ZipFile, is_zipfile
+from os.path import join, isdir, getsize, relpath
+from os import walk
+import moduletools
+import bytecode
+import tracing
+import bundle
+import tarfile
+import re
+import sys
+
+
+"""
+Breaks the output of a build down by size, so that what makes a distribution big can be found and kept in check. Every
+file of the output is put in a group: each top-level module or package of the program (its bytecode along with the data
+files next to it), of the standard library (its bytecode in `Lib`, or in the `pythonXY.zip` archive, and its extension
+modules in `DLLs`), each file of the interpreter itself, and the `libs`, `Scripts` and `Tools` folders copied along with
+it. The zip archives and bundles of the output are broken down by the modules they hold, their headers and indexes
+being counted apart. An output written into an archive (see the `distribution` module) is read from the archive, whose
+own size is what downloading it takes, and the archives inside it are counted whole.
+
+When the project is passed, each group also says why it was included: the program imports it (see
+`moduletools._import_graph`), the interpreter imports it by itself when starting up, it was imported when the program
+was traced (see the `tracing` module), or it's listed in `moduletools._runtime_imports` or `_whole_packages`. Bytecode
+of the project the program never imports is pointed out, since it can likely be left out (see the `ignore` module).
+
+A size budget can be set: the build then fails if the output is bigger, so that a distribution doesn't grow unnoticed.
+"""
+
+_units = {'': 1, 'k': 1 << 10, 'm': 1 << 20, 'g': 1 << 30}
+_defaults = {
+    'project': 'in the project, but never imported by the program',
+    'data': 'data files of the project',
+    'stdlib': 'not imported by the program',
+    'interpreter': 'the interpreter',
+    'libs': 'copied whole along with the interpreter',
+    'Scripts': 'copied whole along with the interpreter',
+    'Tools': 'copied for a module of the same name',
+    'launcher': 'runs the program',
+    'build': 'the manifest of the build, for incremental builds',
+    'archive': 'the headers and index of the archive',
+}
+
+
+def parse_size(text: str) -> int:
+    """
+    Reads a size such as `50MB`, `1.5G`, `800 KiB` or `4096` into bytes. The units are powers of 1024.
+    """
+
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([kmg]?)(?:i?b)?\s*', text, re.IGNORECASE)
+    if match is None:
+        raise ValueError(f'{text!r} is not a size, such as 50MB or 800KB.')
+
+    return int(float(match[1]) * _units[match[2].lower()])
+
+
+def _files(output: str) -> tuple:
+    """
+    Returns the files of an output, a directory or an archive, as pairs of their path relative to it, with forward
+    slashes, and their size, along with the size of the archive (None for a directory).
+    """
+
+    if isdir(output):
+        files = []
+        for root, dirs, names in walk(output):
+            files.extend((relpath(join(root, name), output).replace('\\', '/'), getsize(join(root, name))) for name in names)
+        return files, None
+
+    if is_zipfile(output):
+        with ZipFile(output) as archive:
+            files = [(info.filename, info.file_size) for info in archive.infolist() if not info.is_dir()]
+    else:
+        with tarfile.open(output, 'r:*') as archive:
+            files = [(member.name, member.size) for member in archive.getmembers() if member.isfile()]
+
+    return files, getsize(output)
+
+
+def _top(name: str) -> str:
+    """
+    Returns the top-level module a file of a module stands for, such as `json` for `json.pyc` or `_ssl` for `_ssl.pyd`.
+    """
+
+    return name.split('.')[0]
+
+
+def _nested(path: str) -> list:
+    """
+    Returns the files held in a zip archive or a bundle as tuples of the top-level module they belong to, the bytes
+    they take in it, whether they are bytecode and the folder they belong to (0 for the program's, above for a
+    library's, such as the standard library's in a bundle). The bytes taken by anything else are returned under None.
+    """
+
+    files = []
+    if path[-len(bundle.extension):] == bundle.extension:
+        index = bundle.read_index(path)
+        files = [(_top(name), length, True, root) for name, (offset, length, package, root) in index['modules'].items()
+                 if name != '__main__' and package is not None]
+    else:
+        with ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    parts = info.filename.split('/')
+                    files.append((_top(parts[0]) if len(parts) == 1 else parts[0], info.compress_size, parts[-1][-4:] == '.pyc', 0))
+
+    files.append((None, getsize(path) - sum(file[1] for file in files), False, 0))
+    return files
+
+
+def _group(parts: list, interpreter: bool) -> tuple:
+    """
+    Returns the section and the name of the group a file of the output belongs to, from the parts of its path.
+    """
+
+    if interpreter and parts[0] == 'Python':
+        parts = parts[1:]
+        if len(parts) == 1:
+            return 'interpreter', parts[0]
+        if parts[0] in ('Lib', 'DLLs'):
+            return 'stdlib', _top(parts[1])
+        if parts[0] in ('libs', 'Scripts', 'Tools'):
+            return parts[0], parts[0]
+        return 'interpreter', parts[0]
+
+    if interpreter and parts[0] == 'bytecode':
+        parts = parts[1:]
+    elif interpreter and len(parts) == 1:
+        return 'launcher', parts[0]
+
+    if parts == [bytecode._manifest_name]:
+        return 'build', parts[0]
+    if len(parts) == 1 and parts[0][-4:] == '.pyc':
+        return 'project', _top(parts[0])
+    return 'project', parts[0]
+
+
+def reasons(project: str, entry: str = None, profile: dict = None, workers: int = None, graph: tuple = None) -> dict:
+    """
+    Returns why each top-level module of the program and of the standard library would be packed in, as a list of
+    reasons keyed by their section and name, from what the program imports, what the interpreter imports by itself,
+    the profile of the modules it imported when traced and the modules PyToPyc always packs in. The import graph of the
+    program can be passed if it was already read.
+    """
+
+    stdlib, local = graph if graph is not None else moduletools._import_graph(project, entry, workers)
+    traced = list(tracing.index(profile)) if profile is not None else []  # The top-level modules, from the profile's index.
+    why = {}
+    sources = ((moduletools._startup_modules(), 'imported by the interpreter at startup'),
+               (stdlib, f'imported by {entry or "the project"}'),
+               (traced, 'imported when the program was traced'),
+               (moduletools._runtime_imports, 'listed in moduletools._runtime_imports'),
+               (moduletools._whole_packages, 'kept whole, since its submodules are imported by name'))
+    for modules, reason in sources:
+        for top in tracing.top_level(list(modules)):
+            if top in sys.stdlib_module_names:
+                why.setdefault(('stdlib', top), []).append(reason)
+
+    for module in local:
+        why.setdefault(('project', _top(module)), [f'imported by {entry or "the project"}'])
+    for top in traced:  # The modules of the project it imports by name are only found by tracing it.
+        if top not in sys.stdlib_module_names:
+            why.setdefault(('project', top), []).append('imported when the program was traced')
+    if entry is not None:
+        why[('project', entry)] = ['the entry module']
+
+    return why
+
+
+def analyze(output: str, project: str = None, entry: str = None, profile: dict = None, workers: int = None,
+            graph: tuple = None) -> dict:
+    """
+    Breaks down an output, a directory or an archive, into the groups of files it holds, the biggest first: for each,
+    its section (`project`, `stdlib`, `interpreter`, `libs`, `Scripts`, `Tools`, `launcher` or `build`), its name, how
+    many files and bytes it takes, how many of those bytes are bytecode and, if the project is passed, why it was
+    included (see `reasons`, which is passed the import graph if it was already read). Also returns the total files and
+    bytes, the bytes of each section and, for an archive, its size.
+    """
+
+    files, archive_bytes = _files(output)
+    interpreter = any(path.startswith('Python/') for path, size in files) and any(path.startswith('bytecode/') for path, size in files)
+    why = reasons(project, entry, profile, workers, graph) if project is not None else {}
+    groups = {}
+
+    def add(section: str, name: str, size: int, compiled: bool) -> None:
+        group = groups.setdefault((section, name), {'section': section, 'name': name, 'files': 0, 'bytes': 0, 'bytecode_bytes': 0})
+        group['files'] += 1
+        group['bytes'] += size
+        group['bytecode_bytes'] += size if compiled else 0
+
+    for path, size in files:
+        parts = path.split('/')
+        section, name = _group(parts, interpreter)
+        if archive_bytes is None and section in ('project', 'stdlib', 'interpreter') and parts[-1].endswith(('.zip', bundle.extension)):
+            if parts[-1].endswith(bundle.extension):
+                why.setdefault(('project', _top(parts[-1])), ['runs the program from the bundle'])
+            for module, nested_size, compiled, root in _nested(join(output, *parts)):
+                if module is None:
+                    add('archive', parts[-1], nested_size, False)
+                else:
+                    add('stdlib' if section != 'project' or root else 'project', module, nested_size, compiled)
+        else:
+            add(section, name, size, parts[-1][-4:] == '.pyc')
+
+    for group in groups.values():
+        key = (group['section'], group['name'])
+        default = 'data' if group['section'] == 'project' and not group['bytecode_bytes'] else group['section']
+        group['reasons'] = why.get(key) or ([_defaults[default]] if project is not None or default not in ('project', 'stdlib') else [])
+
+    sections = {}
+    for group in groups.values():
+        sections[group['section']] = sections.get(group['section'], 0) + group['bytes']
+
+    return {
+        'output': output,
+        'files': len(files),
+        'bytes': sum(size for path, size in files),
+        'archive_bytes': archive_bytes,
+        'sections': sections,
+        'groups': sorted(groups.values(), key=lambda group: group['bytes'], reverse=True),
+    }
+
+
+def _human(size: int) -> str:
+    """
+    Returns a size in bytes the way a person reads it, such as `1.5 MB`.
+    """
+
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+        size /= 1024
+
+    return f'{size:.1f} GB'
+
+
+def print_report(analysis: dict, top: int = 20) -> None:
+    """
+    Prints the size of an output, the size of each of its sections and its `top` biggest groups with why each was
+    included.
+    """
+
+    archived = f', {_human(analysis["archive_bytes"])} archived' if analysis['archive_bytes'] is not None else ''
+    print(f"{analysis['output']} takes {_human(analysis['bytes'])} in {analysis['files']} file(s){archived}: " +
+          ', '.join(f'{section} {_human(size)}' for section, size in sorted(analysis['sections'].items(), key=lambda item: -item[1])) + '.')
+    if top:
+        print(f"{'bytes':>12} {'files':>6}  {'section':<12} {'name':<28} why")
+        for group in analysis['groups'][:top]:
+            print(f"{group['bytes']:>12} {group['files']:>6}  {group['section']:<12} {group['name']:<28} {'; '.join(group['reasons'])}")
+
+
+def check(analysis: dict, budget: int) -> None:
+    """
+    Raises ValueError if an output is bigger than the budget, in bytes: its archive's size if it was written into one,
+    which is what is downloaded, or its size otherwise.
+    """
+
+    size = analysis['bytes'] if analysis['archive_bytes'] is None else analysis['archive_bytes']
+    if size > budget:
+        biggest = ', '.join(f"{group['name']} ({_human(group['bytes'])})" for group in analysis['groups'][:5])
+        raise ValueError(f"{analysis['output']} takes {_human(size)}, over its budget of {_human(budget)} by "
+                         f"{_human(size - budget)}. The biggest groups are {biggest}.")
@@ -0,0 +1,121 @@
+from subprocess import run as run_process, DEVNULL, PIPE, TimeoutExpired
+from os.path import join, isfile
+from time import perf_counter
+import sys
+
+
+"""
+Checks how long the packaged program takes to start once it's built. The program is run from the output the way the
+batch scripts run it (from the `bytecode` folder with the packed-in interpreter, or from the output itself with the
+interpreter running PyToPyc when none was packed in, with `-OO`), along with `-X importtime`, which has the
+interpreter write how long each of its imports took to its standard error. That is read into a report of the cost of
+each module's import, ranked by its cumulative time: the time spent importing the module itself and the modules it
+imported. With the interpreter packed in, the program can be run with the interpreter running PyToPyc as well, to check
+that the packed one doesn't start it any slower.
+
+Since most programs don't exit on their own once started, the program is stopped after `timeout` seconds; the imports
+it made by then have already been written out. Its standard input is closed and its output thrown away.
+"""
+
+_header = 'import time:'
+_interpreters = ('python.exe', 'python3', 'python', join('bin', 'python3'), join('bin', 'python'))
+
+
+def packed_python(output: str) -> str:
+    """
+    Returns the path of the interpreter packed into the `Python` folder of an output, or None if there isn't one.
+    """
+
+    for name in _interpreters:
+        path = join(output, 'Python', name)
+        if isfile(path):
+            return path
+
+    return None
+
+
+def parse(stderr: str) -> list:
+    """
+    Reads the lines written by `-X importtime` into a list of the modules imported, in the order their imports
+    finished, each as a dictionary with its name, the microseconds spent importing it alone (`self_us`) and along with
+    the modules it imported (`cumulative_us`), and how deep it was imported (0 for the imports of the program itself or
+    of the interpreter's startup, 1 for the ones they made, and so on). Anything else written to the standard error is
+    left out.
+    """
+
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith(_header):
+            continue
+
+        try:
+            self_us, cumulative_us, name = line[len(_header):].split('|', 2)
+            self_us, cumulative_us = int(self_us), int(cumulative_us)
+        except ValueError:  # The header line, or a line cut off when the program was stopped.
+            continue
+
+        indent = len(name) - len(name.lstrip(' '))
+        modules.append({'module': name.strip(), 'self_us': self_us, 'cumulative_us': cumulative_us, 'depth': (indent - 1) // 2})
+
+    return modules
+
+
+def profile(directory: str, target: str, python: str = None, runs: int = 1, timeout: float = 30.0) -> dict:
+    """
+    Runs the program's entry point (its bytecode, zip archive or bundle bootstrap) from the directory with `-OO -X
+    importtime`, with the interpreter passed or the one running PyToPyc, `runs` times, and returns its import-cost
+    report: the modules it imported ranked by their cumulative time, the best of the runs being kept for each, the
+    total time spent importing at startup, in microseconds, and how long the best run took, in seconds.
+    """
+
+    python = python or sys.executable
+    command = [python, '-OO', '-X', 'importtime', target]
+    best, seconds, returncode, timed_out = {}, None, None, False
+    for i in range(max(runs, 1)):
+        start = perf_counter()
+        try:
+            process = run_process(command, cwd=directory, stdin=DEVNULL, stdout=DEVNULL, stderr=PIPE, timeout=timeout)
+            stderr, returncode = process.stderr, process.returncode
+        except TimeoutExpired as error:  # The imports it made by then have already been written out.
+            stderr, timed_out = error.stderr or b'', True
+        elapsed = perf_counter() - start
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+
+        for module in parse(stderr.decode(errors='replace')):
+            kept = best.get((module['module'], module['depth']))
+            if kept is None or module['cumulative_us'] < kept['cumulative_us']:
+                best[(module['module'], module['depth'])] = module
+
+    modules = sorted(best.values(), key=lambda module: module['cumulative_us'], reverse=True)
+    return {
+        'python': python,
+        'command': command,
+        'directory': directory,
+        'returncode': returncode,
+        'timed_out': timed_out,
+        'seconds': seconds,
+        'total_us': sum(module['cumulative_us'] for module in modules if module['depth'] == 0),
+        'modules': modules,
+    }
+
+
+def print_report(report: dict, top: int = 20) -> None:
+    """
+    Prints the `top` modules of an import-cost report, the most costly first.
+    """
+
+    print(f"Startup of {report['command'][-1]} with {report['python']}: {report['total_us'] / 1000:.1f} ms importing "
+          f"{len(report['modules'])} module(s), {report['seconds']:.2f} seconds in all"
+          f"{' (stopped after the timeout)' if report['timed_out'] else ''}.")
+    print(f"{'cumulative [us]':>16} {'self [us]':>10} {'depth':>6}  module")
+    for module in report['modules'][:top]:
+        print(f"{module['cumulative_us']:>16} {module['self_us']:>10} {module['depth']:>6}  {module['module']}")
+
+
+def compare(packed: dict, system: dict) -> float:
+    """
+    Returns how many times as long the packed interpreter spent importing at startup as the system one did, from their
+    import-cost reports.
+    """
+
+    return packed['total_us'] / system['total_us'] if system['total_us'] else float('inf')
@@ -0,0 +1,199 @@
+from subprocess import run, DEVNULL, TimeoutExpired
+from tempfile import TemporaryDirectory
+from os.path import join
+from os import replace
+import json
+import sys
+
+
+"""
+Finds the modules a program imports by running it, rather than by reading its imports (see `moduletools._import_graph`),
+so that the modules it imports by name at runtime (through `importlib.import_module`, `__import__`, plugins or codecs)
+are found as well. The program is run in a separate interpreter for each workload (a list of arguments it's run with),
+isolated from the environment (`-I`) and without writing any bytecode into the project (`-B`), with a finder put first
+in `sys.meta_path` that writes down every module it imports as the import starts, and finds nothing. Unlike the `import`
+audit event, which only the `import` statement raises, the finder also sees the modules imported through `importlib`.
+The names are written out one by one, so the modules a program that doesn't exit on its own imported before it's
+stopped are kept.
+
+The modules of every run are merged into a profile kept in the project (`.pytopyc-profile.json` by default), so that
+builds can reuse it instead of running the program every time, and so that running a new workload adds the modules it
+imports to the ones found before. Along with the modules of each workload, in the order they were imported, the profile
+holds a prefix tree of their names (see `index`): each package maps to the modules and packages it holds, so the
+top-level modules imported, or the modules of a package, are read from it without a pass over every name.
+A profile is only used by the version of Python that wrote it, since another version imports other modules.
+"""
+
+profile_name = '.pytopyc-profile.json'
+
+# Runs the entry file as `__main__` without importing anything (as runpy would), since a module imported before the
+# program imports it would not be seen: a module already loaded isn't looked for again.
+_DRIVER = '''\
+import sys
+output = open(sys.argv[1], 'a', encoding='utf-8')
+seen = set()
+
+
+def record(name):
+    if name not in seen:
+        seen.add(name)
+        output.write(name + '\\n')
+        output.flush()
+
+
+class Recorder:
+    @staticmethod
+    def find_spec(name, path=None, target=None):
+        record(name)
+        return None
+
+
+for name in list(sys.modules):
+    record(name)
+sys.meta_path.insert(0, Recorder)
+
+project, entry = sys.argv[2], sys.argv[3]
+sys.argv = [entry] + sys.argv[4:]
+sys.path.insert(0, project)
+main = type(sys)('__main__')
+main.__file__ = entry
+main.__builtins__ = __builtins__
+sys.modules['__main__'] = main
+with open(entry, 'rb') as file:
+    code = compile(file.read(), entry, 'exec')
+exec(code, main.__dict__)
+'''
+
+
+def _tree(names: list) -> dict:
+    """
+    Returns the prefix tree of dotted module names: a dictionary mapping each top-level name to the tree of the names
+    under it.
+    """
+
+    tree = {}
+    for name in names:
+        node = tree
+        for part in name.split('.'):
+            node = node.setdefault(part, {})
+
+    return tree
+
+
+def under(tree: dict, package: str) -> list:
+    """
+    Returns the full names of the modules under a package in a prefix tree of module names, the package included, each
+    package before the modules it holds and in the order they were first imported.
+    """
+
+    node = tree
+    for part in package.split('.'):
+        node = node.get(part)
+        if node is None:
+            return []
+
+    names, stack = [], [(package, node)]
+    while stack:
+        name, node = stack.pop()
+        names.append(name)
+        stack.extend(reversed([(f'{name}.{part}', child) for part, child in node.items()]))
+
+    return names
+
+
+def top_level(names: list) -> list:
+    """
+    Returns the top-level names of a list of module names, in the order they first show up.
+    """
+
+    return list(_tree(names))
+
+
+def _trace(project: str, entry: str, arguments: list, timeout: float) -> tuple:
+    """
+    Runs the entry file of the project with the arguments passed in an isolated interpreter and returns the modules it
+    imported, in the order it imported them, along with its return code (None if it was stopped after the timeout).
+    """
+
+    with TemporaryDirectory() as temporary:
+        path = join(temporary, 'modules.txt')
+        command = [sys.executable, '-I', '-B', '-c', _DRIVER, path, project, join(project, f'{entry}.py'), *arguments]
+        try:
+            returncode = run(command, cwd=project, stdin=DEVNULL, stdout=DEVNULL, stderr=DEVNULL, timeout=timeout).returncode
+        except TimeoutExpired:
+            returncode = None
+
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                names = file.read().split()
+        except FileNotFoundError:
+            names = []
+
+    return [name for name in names if name != '__main__'], returncode
+
+
+def load(path: str) -> dict:
+    """
+    Reads a profile. Returns None if there is none, or if it was written by another version of Python.
+    """
+
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            profile = json.load(file)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    return profile if profile.get('python') == sys.implementation.cache_tag else None
+
+
+def save(path: str, profile: dict) -> None:
+    """
+    Writes a profile. It is written to a temporary file first so that an interrupted build never leaves a broken profile
+    behind.
+    """
+
+    with open(path + '.tmp', 'w', encoding='utf-8') as file:
+        json.dump(profile, file, indent=1)
+    replace(path + '.tmp', path)
+
+
+def modules(profile: dict) -> list:
+    """
+    Returns every module of a profile, in the order they were first imported.
+    """
+
+    return list(dict.fromkeys(name for names in profile['workloads'].values() for name in names))
+
+
+def index(profile: dict) -> dict:
+    """
+    Returns the prefix tree of the modules of a profile, its top-level names being the top-level modules imported.
+    """
+
+    return profile.get('index') or _tree(modules(profile))
+
+
+def collect(project: str, entry: str, workloads: list = ((),), timeout: float = 60.0, path: str = None,
+            verbose: bool = False) -> dict:
+    """
+    Runs the entry module of the project once for each workload, a list of the arguments it's run with, and merges the
+    modules imported into the profile at the path passed (by default `.pytopyc-profile.json` in the project), which is
+    written back and returned. A workload that was run before has the modules it imports this time added to the ones it
+    imported then.
+    """
+
+    path = path or join(project, profile_name)
+    profile = load(path) or {'version': 1, 'python': sys.implementation.cache_tag, 'entry': entry, 'workloads': {}}
+
+    for arguments in workloads:
+        names, returncode = _trace(project, entry, list(arguments), timeout)
+        key = ' '.join(arguments)
+        profile['workloads'][key] = list(dict.fromkeys(profile['workloads'].get(key, []) + names))
+        if verbose:
+            status = 'stopped after the timeout' if returncode is None else f'exited with {returncode}'
+            print(f'Traced {len(names)} module(s) imported by {entry} {key} ({status}).')
+
+    profile['entry'] = entry
+    profile['index'] = _tree(modules(profile))
+    save(path, profile)
+    return profile
@@ -0,0 +1,237 @@
+from ctypes.util import find_library
+from os.path import join, dirname, basename, isdir
+from os import read, close, strerror
+from functools import partial
+from time import perf_counter, sleep
+from select import select
+import bytecode
+import ignore
+import ctypes
+import struct
+import sys
+
+
+"""
+Keeps the output of a build in sync with its input while the input is being worked on. Once the output has been built,
+the input tree is watched and, whenever something changes in it, only the directories where it changed are brought up to
+date (see `bytecode.Builder.update`), in the time it takes to copy the files that changed rather than the time it takes
+to walk the whole tree again.
+On Linux, the changes are reported by the kernel through inotify, so that they are picked up within a few milliseconds.
+Elsewhere, or when inotify can't be used (such as when the tree has more directories than the user is allowed to
+watch), the tree is polled: its directories are read every so often and compared with what they held before.
+"""
+
+_IN_ATTRIB = 0x4
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_FROM = 0x40
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_Q_OVERFLOW = 0x4000
+_IN_IGNORED = 0x8000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_MASK = _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_EVENT = struct.Struct('iIII')
+_settle = 0.02  # How long to wait for more changes after one is seen, since saving a file usually changes a few.
+
+
+class Watcher:
+    """
+    Watches the input of a builder's last build and keeps its output up to date. Each watcher holds its own inotify
+    instance and watches, so that several outputs can be kept in sync at the same time.
+    """
+
+    def __init__(self, builder: bytecode.Builder, input_: str, output: str, interval: float = 0.5, rebuild=None,
+                 polling: bool = False):
+        self.builder = builder
+        self.input = input_
+        self.output = output
+        self.interval = interval
+        self.rebuild = rebuild if rebuild is not None else partial(builder.build, input_, output)
+        self.polling = polling
+
+        self._libc = None
+        self._fd = None
+        self._watches = {}
+
+    def _inotify_init(self) -> bool:
+        """
+        Opens an inotify instance. Returns whether inotify can be used.
+        """
+
+        if not sys.platform.startswith('linux'):
+            return False
+
+        try:
+            self._libc = ctypes.CDLL(find_library('c') or 'libc.so.6', use_errno=True)
+            fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        except (OSError, AttributeError):
+            return False
+
+        if fd < 0:
+            return False
+
+        self._fd = fd
+        self._watches.clear()
+        return True
+
+    def _add_watches(self, relative: str = '') -> None:
+        """
+        Watches a directory of the input and every directory under it, cache folders included, except the ones the
+        filter rules of the build leave out.
+        """
+
+        try:
+            for current, files, cached in bytecode._walk(self.input, relative, self.builder._rules, self.builder.cache):
+                self._add_watch(current)
+                if cached or isdir(join(self.input, current, self.builder.cache)):
+                    self._add_watch(join(current, self.builder.cache))
+        except FileNotFoundError:  # The directory was removed before it could be watched.
+            pass
+
+    def _add_watch(self, relative: str) -> None:
+        """
+        Watches a single directory of the input.
+        """
+
+        wd = self._libc.inotify_add_watch(self._fd, join(self.input, relative).encode(sys.getfilesystemencoding()), _MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, strerror(error), join(self.input, relative))
+        self._watches[wd] = relative
+
+    def _changed_directory(self, relative: str) -> str:
+        """
+        Returns the directory of the input a change in this directory belongs to: a cache folder's changes belong to
+        the directory it caches the bytecode of.
+        """
+
+        return dirname(relative) if basename(relative) == self.builder.cache else relative
+
+    def _read_events(self, timeout: float = None) -> set:
+        """
+        Waits for changes in the input and returns the directories they happened in, relative to the input. New
+        directories are watched as they show up. If the kernel dropped events, the whole input is returned as changed.
+        """
+
+        changed = set()
+        ready = select([self._fd], [], [], timeout)[0]
+        while ready:
+            data = read(self._fd, 1 << 16)
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = _EVENT.unpack_from(data, offset)
+                name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b'\0').decode(sys.getfilesystemencoding())
+                offset += _EVENT.size + length
+
+                if mask & _IN_Q_OVERFLOW:
+                    changed.add('')
+                    continue
+                if mask & _IN_IGNORED:
+                    self._watches.pop(wd, None)
+                    continue
+
+                relative = self._watches.get(wd)
+                if relative is None:
+                    continue
+                if mask & _IN_ISDIR and name == self.builder.cache:
+                    changed.add(relative)
+                    if mask & (_IN_CREATE | _IN_MOVED_TO):
+                        self._add_watches(join(relative, name))
+                elif mask & _IN_ISDIR:
+                    if ignore.excluded(self.builder._rules, join(relative, name), True):
+                        continue
+                    changed.add(join(relative, name))
+                    if mask & (_IN_CREATE | _IN_MOVED_TO):
+                        self._add_watches(join(relative, name))
+                else:
+                    changed.add(self._changed_directory(relative))
+
+            ready = select([self._fd], [], [], _settle)[0]
+
+        return changed
+
+    def _snapshot(self) -> dict:
+        """
+        Reads the whole input and returns, for each of its directories, the names, sizes and modification times of its
+        files and of the files in its cache folder.
+        """
+
+        snapshot = {}
+        for relative, files, cached in bytecode._walk(self.input, rules=self.builder._rules, cache=self.builder.cache):
+            snapshot[relative] = frozenset((entry.name, entry.stat().st_size, entry.stat().st_mtime_ns) for entry in files) | \
+                                 frozenset((join(self.builder.cache, entry.name), entry.stat().st_size, entry.stat().st_mtime_ns) for entry in cached)
+
+        return snapshot
+
+    def _poll(self, previous: dict) -> tuple:
+        """
+        Waits for the interval and returns the directories of the input that changed since the previous snapshot, along
+        with the new snapshot.
+        """
+
+        sleep(self.interval)
+        snapshot = self._snapshot()
+        changed = {relative for relative, entries in snapshot.items() if previous.get(relative) != entries}
+        changed.update(relative for relative in previous if relative not in snapshot)
+        return changed, snapshot
+
+    def run(self) -> None:
+        """
+        Keeps the output up to date until interrupted with Ctrl+C (see `watch`).
+        """
+
+        builder = self.builder
+        inotify = not self.polling and self._inotify_init()
+        if inotify:
+            try:
+                self._add_watches()
+            except OSError as error:
+                if builder.verbose: print(f'Unable to watch the input with inotify ({error}), polling it instead.')
+                close(self._fd)
+                inotify = False
+        snapshot = None if inotify else self._snapshot()
+
+        if builder.verbose: print(f'Watching {self.input} for changes ({"inotify" if inotify else "polling"}). Press Ctrl+C to stop.')
+        try:
+            while True:
+                if inotify:
+                    changed = self._read_events()
+                else:
+                    changed, snapshot = self._poll(snapshot)
+                if not changed:
+                    continue
+
+                start = perf_counter()
+                try:
+                    if builder._archive is not None or builder._compiling or builder.prune:
+                        result = self.rebuild()
+                    else:
+                        result = builder.update(self.input, self.output, changed)
+                except OSError as error:
+                    if builder.verbose: print(f'The update failed: {error}')
+                    continue
+
+                if builder.verbose:
+                    print(f"Updated {result.files('copy') + result.files('compile')} file(s), removed {result.files('delete')}, "
+                          f"in {(perf_counter() - start) * 1000:.0f} ms.")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if inotify:
+                close(self._fd)
+
+
+def watch(builder: bytecode.Builder, input_: str, output: str, interval: float = 0.5, rebuild=None,
+          polling: bool = False) -> None:
+    """
+    Watches the input of the builder's last build and keeps its output up to date until interrupted with Ctrl+C.
+    Inotify is used where it's available, unless `polling` is set, and the input is polled every `interval` seconds
+    otherwise. When the output is an archive, the bytecode is compiled from the sources or the build is pruned, the output
+    can't be updated directory by directory, so the build is run again through `rebuild`, which by default builds the input
+    into the output with the builder.
+    """
+
+    Watcher(builder, input_, output, interval, rebuild, polling).run()